@@ -0,0 +1,214 @@
+"""Timing benchmarks for building and serializing the NALCMS STAC.
+
+Run with `scripts/benchmark`. Results are written as JSON, and can be
+compared against a stored baseline to flag regressions:
+
+    scripts/benchmark -o bench.json
+    scripts/benchmark --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List, Optional
+
+from stactools.nalcms import __version__, stac, validate
+from stactools.nalcms.constants import GSDS, PERIODS, REGIONS
+
+Benchmark = Callable[[], Any]
+
+
+def _create_items(year: str) -> Benchmark:
+    def run() -> None:
+        stac.clear_item_templates()
+        for reg in REGIONS.keys():
+            for gsd in GSDS:
+                stac.create_item(reg, gsd, year, "")
+
+    return run
+
+
+def _create_period_collections() -> None:
+    for period in PERIODS.keys():
+        stac.create_period_collection(period)
+
+
+def _create_full_collection() -> None:
+    stac.clear_item_templates()
+    stac.create_full_collection()
+
+
+def _to_dict(collection: Any) -> Benchmark:
+    def run() -> None:
+        for catalog, _, items in collection.walk():
+            json.dumps(catalog.to_dict(include_self_link=False))
+            for item in items:
+                json.dumps(item.to_dict(include_self_link=False))
+
+    return run
+
+
+def _save(collection: Any, workers: int = 1, indent: bool = True) -> Benchmark:
+    def run() -> None:
+        with TemporaryDirectory() as destination:
+            collection.normalize_hrefs(destination)
+            stac.save_collection(collection, workers, indent=indent)
+
+    return run
+
+
+def _save_pystac(collection: Any) -> Benchmark:
+    # The `Catalog.save` path that `save_collection` replaces
+    def run() -> None:
+        with TemporaryDirectory() as destination:
+            collection.normalize_hrefs(destination)
+            collection.save()
+
+    return run
+
+
+def _validate(collection: Any, workers: int = 1) -> Benchmark:
+    # The validation of `create-collection`, offline against the bundled
+    # schemas and the local schema cache. The tree is saved on the first run,
+    # the warm-up, and kept until exit.
+    tmp_dir = TemporaryDirectory()
+
+    def run() -> None:
+        root_href = os.path.join(tmp_dir.name, "collection.json")
+        if not os.path.isfile(root_href):
+            collection.normalize_hrefs(tmp_dir.name)
+            stac.save_collection(collection)
+        validate.validate_tree(root_href, offline=True, workers=workers)
+
+    return run
+
+
+def _cli_startup() -> None:
+    # A fresh interpreter loading the stac CLI and discovering every plugin
+    subprocess.run([sys.executable, "-c", "import stactools.cli.cli"], check=True)
+
+
+def benchmarks(include_validation: bool = True) -> Dict[str, Benchmark]:
+    """Returns the benchmarks by name."""
+    collection = stac.create_full_collection()
+    result = {
+        "cli_startup": _cli_startup,
+        "create_item_yearly": _create_items("2010"),
+        "create_item_change": _create_items("2010-2015"),
+        "create_period_collection": _create_period_collections,
+        "create_full_collection": _create_full_collection,
+        "to_dict": _to_dict(collection),
+        "save_pystac": _save_pystac(collection),
+        "save": _save(collection),
+        "save_workers": _save(collection, workers=4),
+        "save_no_indent": _save(collection, workers=4, indent=False),
+    }
+    if include_validation:
+        result["validate"] = _validate(collection)
+        result["validate_workers"] = _validate(collection, workers=4)
+    return result
+
+
+def time_benchmark(func: Benchmark, repeat: int) -> Dict[str, Any]:
+    """Runs `func` once to warm up, then `repeat` times, and returns the
+     timings in seconds.
+    """
+    func()
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+    }
+
+
+def run(names: Optional[List[str]] = None,
+        repeat: int = 5,
+        include_validation: bool = True) -> Dict[str, Any]:
+    """Runs the benchmarks and returns the results as a JSON serializable
+     dict.
+
+    Args:
+        names (list): Only run these benchmarks. Runs all of them by default.
+        repeat (int): Number of timed runs of each benchmark.
+        include_validation (bool): Include the `validate` benchmarks.
+    """
+    available = benchmarks(include_validation)
+    selected = names or list(available.keys())
+    unknown = [name for name in selected if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "benchmarks": {name: time_benchmark(available[name], repeat)
+                       for name in selected},
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float) -> List[str]:
+    """Returns a message for every benchmark whose median time is more than
+     `threshold` (e.g. 0.2 for 20%) slower than in the baseline.
+    """
+    regressions = []
+    for name, timing in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        before = baseline["benchmarks"][name]["median"]
+        after = timing["median"]
+        if before > 0 and (after - before) / before > threshold:
+            regressions.append(f"{name}: {before:.4f}s -> {after:.4f}s "
+                               f"(+{(after - before) / before:.0%})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("names", nargs="*", help="Benchmarks to run (default: all).")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Timed runs per benchmark.")
+    parser.add_argument("-o", "--output", help="Write the results JSON to this file.")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against.")
+    parser.add_argument("--threshold",
+                        type=float,
+                        default=0.2,
+                        help="Allowed slowdown against the baseline (default: 0.2).")
+    parser.add_argument("--no-validate",
+                        action="store_true",
+                        help="Skip the validate benchmarks.")
+    args = parser.parse_args(argv)
+
+    results = run(args.names, args.repeat, not args.no_validate)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Compare the COG profiles on a synthetic land cover raster.
+
+Needs `gdal_translate`. For each profile, reports the time to write the COG,
+its size and the time to read random tiles from it, as JSON:
+
+    python benchmarks/cog_profiles.py --size 8192 -o cog_profiles.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+
+from stactools.nalcms import cog
+from stactools.nalcms.constants import VALUES
+
+
+def write_synthetic_raster(path: str, size: int, seed: int = 0) -> None:
+    """Writes a `size` x `size` land cover GeoTIFF of 64 pixel patches of
+     random NALCMS classes with some speckle, in strips to bound memory.
+    """
+    rng = np.random.default_rng(seed)
+    classes = np.array(list(VALUES.keys()), dtype="uint8")
+    patches = classes[rng.integers(0, len(classes), size=(size // 64 + 1, size // 64 + 1))]
+    profile = dict(driver="GTiff",
+                   width=size,
+                   height=size,
+                   count=1,
+                   dtype="uint8",
+                   nodata=0,
+                   crs="EPSG:3978",
+                   transform=from_origin(0, size * 30, 30, 30),
+                   tiled=True)
+    with rasterio.open(path, "w", **profile) as dst:
+        for row in range(0, size, 512):
+            rows = min(512, size - row)
+            strip = np.repeat(np.repeat(patches[row // 64:(row + rows) // 64 + 1], 64, axis=0),
+                              64,
+                              axis=1)[row % 64:row % 64 + rows, :size]
+            speckle = rng.random(strip.shape) < 0.05
+            strip = np.where(speckle, classes[rng.integers(0, len(classes), strip.shape)], strip)
+            dst.write(strip[np.newaxis].astype("uint8"), window=Window(0, row, size, rows))
+
+
+def read_tiles(path: str, tiles: int, seed: int = 0) -> float:
+    """Returns the time to read `tiles` random 256 x 256 windows."""
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    with rasterio.open(path) as dataset:
+        for _ in range(tiles):
+            col = int(rng.integers(0, max(1, dataset.width - 256)))
+            row = int(rng.integers(0, max(1, dataset.height - 256)))
+            dataset.read(1, window=Window(col, row, 256, 256))
+    return time.perf_counter() - start
+
+
+def run(size: int, tiles: int, profiles: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Converts a synthetic raster with each profile and returns the results
+     as a JSON serializable dict.
+    """
+    results = {}
+    with TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, "synthetic.tif")
+        write_synthetic_raster(source, size)
+        for profile in profiles or list(cog.COG_PROFILES.keys()):
+            destination = os.path.join(tmp_dir, profile)
+            os.mkdir(destination)
+            start = time.perf_counter()
+            output = cog.create_cog(source, destination, cog.cog_args(profile))
+            results[profile] = {
+                "write_seconds": time.perf_counter() - start,
+                "bytes": os.path.getsize(output),
+                "read_seconds": read_tiles(output, tiles),
+            }
+    return {"size": size, "tiles": tiles, "profiles": results}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("profiles", nargs="*", help="Profiles to compare (default: all).")
+    parser.add_argument("--size", type=int, default=4096, help="Raster width and height.")
+    parser.add_argument("--tiles", type=int, default=200, help="Random tiles read per COG.")
+    parser.add_argument("-o", "--output", help="Write the results JSON to this file.")
+    args = parser.parse_args(argv)
+
+    output = json.dumps(run(args.size, args.tiles, args.profiles), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,28 @@
-from stactools.cli import Registry
+import importlib
+from typing import TYPE_CHECKING, Any
+
 import stactools.core
 
-from stactools.nalcms import commands, constants, stac
+if TYPE_CHECKING:
+    from stactools.cli import Registry
 
 stactools.core.use_fsspec()
 
 
-def register_plugin(registry: Registry) -> None:
+def register_plugin(registry: "Registry") -> None:
+    # The commands, and the modules and tables they use, are only loaded
+    # when a nalcms command runs, see `commands.LazyGroup`
+    from stactools.nalcms import commands
+
     registry.register_subcommand(commands.create_nalcms_command)
 
 
+def __getattr__(name: str) -> Any:
+    # Submodules are imported on first access, e.g. `stactools.nalcms.stac`
+    if name in ("constants", "stac"):
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = ["constants", "stac", "assets"]
 __version__ = "0.0.1"
@@ -0,0 +1,146 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+from stactools.nalcms import cog
+from stactools.nalcms.constants import VALUES
+
+# Nodata of the CEC change products
+CHANGE_NODATA = 65535
+BLOCK_SIZE = 512
+
+
+def encode_change(before: np.ndarray,
+                  after: np.ndarray,
+                  nodata_before: Optional[float] = None,
+                  nodata_after: Optional[float] = None) -> np.ndarray:
+    """Returns the change codes `before * 100 + after` (e.g. 1015 for forest
+     to cropland) of two land cover arrays, the codes of `values_change`.
+
+    Pixels that are nodata, or not a land cover class, in either array are
+     `CHANGE_NODATA`.
+    """
+    before = before.astype(np.int32)
+    after = after.astype(np.int32)
+    valid = ((before >= 1) & (before <= max(VALUES)) & (after >= 1) & (after <= max(VALUES)))
+    if nodata_before is not None:
+        valid &= before != nodata_before
+    if nodata_after is not None:
+        valid &= after != nodata_after
+    return np.where(valid, before * 100 + after, CHANGE_NODATA).astype(np.uint16)
+
+
+def write_change_raster(before: str,
+                        after: str,
+                        output_path: str,
+                        workers: int = 1,
+                        block_size: int = BLOCK_SIZE) -> None:
+    """Writes the change raster of two aligned yearly rasters as a tiled,
+     uncompressed GeoTIFF, the intermediate of `create_change_cog`, which
+     compresses it once, in the COG.
+
+    Blocks are read and encoded by `workers` threads, each with its own
+     dataset handles, and written in order as they complete. At most a few
+     blocks per worker are in memory at any time.
+
+    Args:
+        before (str): The earlier land cover raster, see `cog.vsi_path`.
+        after (str): The later land cover raster, on the same grid.
+        output_path (str): The GeoTIFF to write.
+        workers (int): Number of threads encoding blocks.
+        block_size (int): Width and height of the blocks, a multiple of 16.
+    """
+    before_path = cog.vsi_path(before)
+    after_path = cog.vsi_path(after)
+
+    with rasterio.open(before_path) as src_before, rasterio.open(after_path) as src_after:
+        if (src_before.shape != src_after.shape or src_before.transform != src_after.transform
+                or src_before.crs != src_after.crs):
+            raise ValueError(f'"{before}" and "{after}" are not on the same grid')
+        profile = src_before.profile
+        nodata_before = src_before.nodata
+        nodata_after = src_after.nodata
+
+    profile.update(driver="GTiff",
+                   dtype="uint16",
+                   count=1,
+                   nodata=CHANGE_NODATA,
+                   tiled=True,
+                   blockxsize=block_size,
+                   blockysize=block_size,
+                   compress=None,
+                   bigtiff="IF_SAFER")
+    height, width = profile["height"], profile["width"]
+    windows = [
+        Window(col, row, min(block_size, width - col), min(block_size, height - row))
+        for row in range(0, height, block_size) for col in range(0, width, block_size)
+    ]
+
+    local = threading.local()
+    handles: List[Any] = []
+    lock = threading.Lock()
+
+    def encode(window: Window) -> np.ndarray:
+        if not hasattr(local, "datasets"):
+            local.datasets = (rasterio.open(before_path), rasterio.open(after_path))
+            with lock:
+                handles.extend(local.datasets)
+        src_before, src_after = local.datasets
+        return encode_change(src_before.read(1, window=window), src_after.read(1, window=window),
+                             nodata_before, nodata_after)
+
+    try:
+        with rasterio.open(output_path, "w", **profile) as dst, \
+                ThreadPoolExecutor(max_workers=workers) as executor:
+            batch_size = workers * 4
+            for i in range(0, len(windows), batch_size):
+                batch = windows[i:i + batch_size]
+                for window, block in zip(batch, executor.map(encode, batch)):
+                    dst.write(block, 1, window=window)
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def create_change_cog(before: str,
+                      after: str,
+                      destination: str,
+                      name: Optional[str] = None,
+                      workers: int = 1,
+                      args: Optional[List[str]] = None) -> str:
+    """Creates a change COG from two aligned yearly land cover rasters and
+     returns its path, ready to be used as the `source` of
+     `stac.create_item`.
+
+    The change raster is written uncompressed in `destination`, on the same
+     file system as the COG rather than in the temporary directory, and
+     removed once the COG is created.
+
+    Args:
+        before (str): The earlier land cover raster, see `cog.vsi_path`.
+        after (str): The later land cover raster, on the same grid.
+        destination (str): Local directory to save the COG.
+        name (str): Name of the COG, `_cog.tif` is appended. Defaults to
+         `<before>_<after>_change`.
+        workers (int): Number of threads encoding blocks.
+        args (list): gdal_translate creation options, see `cog.cog_args`.
+    """
+    if name is None:
+        stems = [os.path.splitext(os.path.basename(cog.vsi_path(p)))[0] for p in (before, after)]
+        name = f"{stems[0]}_{stems[1]}_change"
+
+    if not os.path.isdir(destination):
+        raise IOError(f'Destination folder "{destination}" not found')
+
+    tmp_path = os.path.join(destination, f".{name}.tmp.tif")
+    try:
+        write_change_raster(before, after, tmp_path, workers)
+        return cog.create_cog(tmp_path, destination, args, output_name=f"{name}_cog.tif")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
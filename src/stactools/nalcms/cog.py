@@ -0,0 +1,280 @@
+import json
+import logging
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import fsspec
+import rasterio
+from stactools.core.utils.convert import cogify
+
+from stactools.nalcms.timing import stage
+
+logger = logging.getLogger(__name__)
+
+# COG creation options. Land cover values are class codes, so overviews
+# pick the most common class (MODE) or a sample (NEAREST), never an average.
+COG_PROFILES: Dict[str, Dict[str, str]] = {
+    "default": {
+        "OVERVIEWS": "IGNORE_EXISTING",
+        "OVERVIEW_RESAMPLING": "MODE",
+    },
+    "fast-write": {
+        "OVERVIEWS": "IGNORE_EXISTING",
+        "OVERVIEW_RESAMPLING": "NEAREST",
+        "COMPRESS": "ZSTD",
+        "LEVEL": "1",
+        "NUM_THREADS": "ALL_CPUS",
+    },
+    "small-size": {
+        "OVERVIEWS": "IGNORE_EXISTING",
+        "OVERVIEW_RESAMPLING": "MODE",
+        "COMPRESS": "DEFLATE",
+        "LEVEL": "9",
+        "PREDICTOR": "YES",
+        "BLOCKSIZE": "1024",
+        "NUM_THREADS": "ALL_CPUS",
+    },
+    "fast-read": {
+        "OVERVIEWS": "IGNORE_EXISTING",
+        "OVERVIEW_RESAMPLING": "MODE",
+        "COMPRESS": "ZSTD",
+        "LEVEL": "9",
+        "BLOCKSIZE": "256",
+        "NUM_THREADS": "ALL_CPUS",
+    },
+}
+
+
+def cog_args(profile: str = "default",
+             options: Optional[Dict[str, Any]] = None,
+             cache_max: Optional[int] = None) -> List[str]:
+    """Returns the gdal_translate arguments for a COG profile.
+
+    Args:
+        profile (str): A key of `COG_PROFILES`.
+        options (dict): COG creation options overriding the profile's, e.g.
+         `{"COMPRESS": "LERC"}`. None values are ignored.
+        cache_max (int): GDAL block cache size in MB.
+    """
+    if profile not in COG_PROFILES:
+        raise ValueError(f'Unknown COG profile "{profile}", use one of {", ".join(COG_PROFILES)}')
+
+    creation_options = dict(COG_PROFILES[profile])
+    creation_options.update(
+        {k.upper(): str(v)
+         for k, v in (options or {}).items() if v is not None})
+
+    args = []
+    if cache_max is not None:
+        args.extend(["--config", "GDAL_CACHEMAX", str(cache_max)])
+    for key, value in creation_options.items():
+        args.extend(["-co", f"{key}={value}"])
+    return args
+
+
+DEFAULT_COG_ARGS = cog_args()
+SUMMARY_FILENAME = "create-cogs-summary.json"
+
+
+class ConversionResult(NamedTuple):
+    source: str
+    output: str
+    status: str
+    seconds: float
+    bytes: int
+    error: Optional[str]
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+def is_zip(source: str) -> bool:
+    """Returns True if `source` is a zip archive, or a GeoTIFF inside one
+     (`archive.zip/member.tif`).
+    """
+    return source.lower().endswith(".zip") or ".zip/" in source.lower()
+
+
+def zip_members(archive: str) -> List[str]:
+    """Returns the GeoTIFFs in a local or remote zip archive. Only the
+     archive's central directory is read.
+    """
+    with fsspec.open(archive, "rb") as f:
+        with zipfile.ZipFile(f) as zf:
+            return [name for name in zf.namelist() if name.lower().endswith((".tif", ".tiff"))]
+
+
+def vsi_path(source: str) -> str:
+    """Returns the GDAL path of a source GeoTIFF.
+
+    A GeoTIFF in a zip archive is read in place through GDAL's `/vsizip/`
+     (and `/vsicurl/` for remote archives) virtual file systems, without
+     extracting it. The source is either `archive.zip/member.tif` or
+     `archive.zip` if the archive holds a single GeoTIFF. Other paths are
+     returned unchanged.
+
+    Args:
+        source (str): Path or URL of a GeoTIFF, or of a zip archive.
+    """
+    if source.startswith("/vsi") or not is_zip(source):
+        return source
+
+    if source.lower().endswith(".zip"):
+        members = zip_members(source)
+        if len(members) != 1:
+            raise ValueError(f'"{source}" holds {len(members)} GeoTIFFs ({", ".join(members)}),'
+                             " use archive.zip/member.tif to pick one")
+        archive, member = source, members[0]
+    else:
+        index = source.lower().index(".zip/") + len(".zip")
+        archive, member = source[:index], source[index + 1:]
+
+    if archive.startswith(("http://", "https://")):
+        archive = f"/vsicurl/{archive}"
+    return f"/vsizip/{archive}/{member}"
+
+
+def cog_path(source: str, destination: str) -> str:
+    """Returns the path of the COG created from `source` in `destination`,
+     with `_cog.tif` in place of the extension. For a zip archive the name
+     of the GeoTIFF inside it is used.
+    """
+    name = os.path.basename(vsi_path(source))
+    return os.path.join(destination, os.path.splitext(name)[0] + "_cog.tif")
+
+
+def is_valid_cog(path: str) -> bool:
+    """Returns True if `path` is a readable Cloud-Optimized GeoTIFF."""
+    try:
+        with rasterio.open(path) as dataset:
+            return bool(dataset.tags(ns="IMAGE_STRUCTURE").get("LAYOUT") == "COG")
+    except rasterio.errors.RasterioIOError:
+        return False
+
+
+def create_cog(source: str,
+               destination: str,
+               args: Optional[List[str]] = None,
+               output_name: Optional[str] = None,
+               extra_args: Optional[List[str]] = None) -> str:
+    """Creates a COG from a GeoTIFF and returns its path. A GeoTIFF in a zip
+     archive is read in place, see `vsi_path`.
+
+    The COG is written next to its final path and only moved there once
+     complete, so an interrupted conversion never leaves a partial COG.
+
+    Args:
+        source (str): An input NALCMS Landcover GeoTiff, or zip archive.
+        destination (str): Local directory to save the COG.
+        args (list): gdal_translate creation options, defaults to
+         `DEFAULT_COG_ARGS`.
+        output_name (str): File name of the COG, defaults to the one of
+         `cog_path`.
+        extra_args (list): Other gdal_translate arguments, e.g. `-srcwin`.
+    """
+    if not os.path.isdir(destination):
+        raise IOError(f'Destination folder "{destination}" not found')
+
+    input_path = vsi_path(source)
+    if output_name is None:
+        output_path = cog_path(input_path, destination)
+    else:
+        output_path = os.path.join(destination, output_name)
+    partial_path = f"{output_path}.part"
+
+    with stage("cogify", source=source):
+        returncode = cogify(input_path, partial_path, DEFAULT_COG_ARGS if args is None else args,
+                            extra_args or [])
+    if returncode != 0:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise IOError(f'Failed to create a COG from "{source}"')
+    os.replace(partial_path, output_path)
+
+    return output_path
+
+
+def list_sources(source: str) -> List[str]:
+    """Returns the GeoTIFFs to convert: the `.tif` and `.zip` files of a
+     directory, other than COGs created by `create_cog`, or the paths listed
+     one per line in a manifest file.
+    """
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, f) for f in os.listdir(source)
+            if f.lower().endswith((".tif", ".tiff", ".zip")) and not f.endswith("_cog.tif"))
+
+    with open(source) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def source_file(source: str) -> str:
+    """Returns the file a source GeoTIFF is read from: the zip archive for a
+     GeoTIFF inside one, else the source itself.
+    """
+    if is_zip(source) and not source.startswith("/vsi"):
+        return source[:source.lower().index(".zip") + len(".zip")]
+    return source
+
+
+def _source_size(source: str) -> int:
+    """Returns the size of a source GeoTIFF, or of the zip archive it is in."""
+    fs, path = fsspec.core.url_to_fs(source_file(source))
+    return int(fs.size(path))
+
+
+def _convert(source: str, destination: str, args: Optional[List[str]]) -> ConversionResult:
+    start = time.perf_counter()
+    output_path = ""
+    try:
+        output_path = cog_path(source, destination)
+        if is_valid_cog(output_path):
+            logger.info(f"Skipping {source}, {output_path} exists")
+            return ConversionResult(source, output_path, "skipped", 0.0, 0, None)
+
+        create_cog(source, destination, args)
+    except Exception as e:
+        logger.error(f"Failed to convert {source}: {e}")
+        return ConversionResult(source, output_path, "failed", time.perf_counter() - start, 0,
+                                str(e))
+    result = ConversionResult(source, output_path, "converted", time.perf_counter() - start,
+                              _source_size(source), None)
+    logger.info(f"Converted {source} in {result.seconds:.1f}s "
+                f"({result.bytes_per_second / 1e6:.1f} MB/s)")
+    return result
+
+
+def create_cogs(sources: List[str],
+                destination: str,
+                workers: int = 1,
+                args: Optional[List[str]] = None) -> List[ConversionResult]:
+    """Creates a COG from each GeoTIFF, skipping those whose COG already
+     exists and is valid, so an interrupted run can simply be started again.
+
+    A failure does not stop the other conversions. A summary with the
+     duration and throughput of each file is written to `SUMMARY_FILENAME`
+     in the destination.
+
+    Args:
+        sources (list): The input GeoTIFFs, see `list_sources`.
+        destination (str): Local directory to save the COGs.
+        workers (int): Number of conversions run at the same time.
+        args (list): gdal_translate creation options, defaults to
+         `DEFAULT_COG_ARGS`.
+    """
+    if not os.path.isdir(destination):
+        raise IOError(f'Destination folder "{destination}" not found')
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda s: _convert(s, destination, args), sources))
+
+    with open(os.path.join(destination, SUMMARY_FILENAME), "w") as f:
+        json.dump([dict(r._asdict(), bytes_per_second=r.bytes_per_second) for r in results],
+                  f,
+                  indent=2)
+
+    return results
@@ -1,24 +1,155 @@
+import json
 import os
-from typing import Any
+from typing import Any, Callable, Iterable, List, Optional, Tuple
 import click
 import logging
-import itertools as it
-
-from stactools.nalcms import stac
-from stactools.nalcms.constants import PERIODS, GSDS, REGIONS, YEARS
-from stactools.core.utils.convert import cogify
 
 logger = logging.getLogger(__name__)
 
 
+class LazyGroup(click.Group):
+    """A click group whose commands are only added, by `load_commands`, when
+     one of them is listed or run. This keeps the imports and tables they
+     need out of the startup of unrelated `stac` commands.
+    """
+    def __init__(self, *args: Any, load_commands: Callable[[click.Group], None],
+                 **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._load_commands: Optional[Callable[[click.Group], None]] = load_commands
+
+    def _load(self) -> None:
+        if self._load_commands is not None:
+            load_commands, self._load_commands = self._load_commands, None
+            load_commands(self)
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        self._load()
+        return list(super().list_commands(ctx))
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        self._load()
+        return super().get_command(ctx, cmd_name)
+
+
+def cog_options(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Adds the COG profile and creation options to a command."""
+    from stactools.nalcms import cog
+
+    options = [
+        click.option("-p",
+                     "--profile",
+                     required=False,
+                     type=click.Choice(list(cog.COG_PROFILES.keys())),
+                     default="default",
+                     help="Named set of COG creation options."),
+        click.option("--blocksize", required=False, type=int, help="Tile size in pixels."),
+        click.option("--compress",
+                     required=False,
+                     type=click.Choice(["DEFLATE", "ZSTD", "LERC", "LERC_ZSTD", "LZW", "NONE"],
+                                       case_sensitive=False),
+                     help="Compression method."),
+        click.option("--predictor",
+                     required=False,
+                     type=click.Choice(["YES", "NO", "STANDARD"], case_sensitive=False),
+                     help="Predictor used with DEFLATE, ZSTD and LZW."),
+        click.option("--num-threads",
+                     required=False,
+                     help="Compression threads, a number or ALL_CPUS."),
+        click.option("--overview-resampling",
+                     required=False,
+                     type=click.Choice(["MODE", "NEAREST"], case_sensitive=False),
+                     help="Overview resampling, class codes must not be averaged."),
+        click.option("--cache-max", required=False, type=int, help="GDAL cache size in MB."),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def get_cog_args(profile: str, blocksize: Optional[int], compress: Optional[str],
+                 predictor: Optional[str], num_threads: Optional[str],
+                 overview_resampling: Optional[str], cache_max: Optional[int]) -> List[str]:
+    """Returns the gdal_translate arguments for the options of `cog_options`."""
+    from stactools.nalcms import cog
+
+    return cog.cog_args(
+        profile, {
+            "BLOCKSIZE": blocksize,
+            "COMPRESS": compress,
+            "PREDICTOR": predictor,
+            "NUM_THREADS": num_threads,
+            "OVERVIEW_RESAMPLING": overview_resampling,
+        }, cache_max)
+
+
 def create_nalcms_command(cli: Any) -> Any:
     """Creates the North American Land Classification Monitoring System STAC."""
     @cli.group(
         "nalcms",
+        cls=LazyGroup,
+        load_commands=add_nalcms_commands,
         short_help=("Commands for working with NALCMS data."),
     )
-    def nalcms() -> None:
-        pass
+    @click.option("--cprofile",
+                  "cprofile_path",
+                  required=False,
+                  help="Write a cProfile report of the command to this file.")
+    @click.option("--timings",
+                  required=False,
+                  help="Write the wall time, CPU time and peak RSS of each stage of"
+                  " the command to this JSON file, or - for stdout.")
+    @click.pass_context
+    def nalcms(ctx: click.Context, cprofile_path: Optional[str], timings: Optional[str]) -> None:
+        """Commands for working with NALCMS data.
+
+        The --cprofile and --timings options go before the command, e.g.
+        `stac nalcms --timings timings.json create-collection -d out`.
+        --cprofile is not the -p/--profile COG profile of the COG commands.
+        """
+        if timings:
+            from stactools.nalcms import timing
+
+            timing.start_recording()
+
+            def write_timings() -> None:
+                recorder = timing.stop_recording()
+                if recorder is not None:
+                    recorder.write(timings)
+
+            ctx.call_on_close(write_timings)
+
+        if cprofile_path:
+            import cProfile
+            import pstats
+            import sys
+
+            profiler = cProfile.Profile()
+
+            def write_profile() -> None:
+                profiler.disable()
+                profiler.dump_stats(cprofile_path)
+                stats = pstats.Stats(profiler, stream=sys.stderr)
+                stats.sort_stats("cumulative").print_stats(20)
+
+            ctx.call_on_close(write_profile)
+            profiler.enable()
+
+    return nalcms
+
+
+def add_nalcms_commands(nalcms: click.Group) -> None:
+    """Adds the NALCMS commands to the `nalcms` group."""
+    from pystac import Collection, Item
+
+    from stactools.nalcms import (change, cog, download, stac, stats, subset, tiles, timing,
+                                  validate, verify, writer)
+    from stactools.nalcms.constants import GSDS, HREF_DIR, PERIODS, REGIONS, YEARS
+
+    def _warn_missing_schemas(results: List[validate.ValidationResult]) -> None:
+        missing = validate.missing_schemas(results)
+        if missing:
+            logger.warning(f"Not validated against {len(missing)} schemas missing from the"
+                           f" schema cache, fill it with `validate --online`: {', '.join(missing)}")
 
     @nalcms.command(
         "create-collection",
@@ -30,27 +161,221 @@ def create_nalcms_command(cli: Any) -> Any:
         required=True,
         help="The output directory for the STAC Collection json.",
     )
-    def create_collection_command(destination: str) -> Any:
+    @click.option(
+        "-w",
+        "--workers",
+        required=False,
+        type=click.IntRange(min=1),
+        default=1,
+        help="Number of threads used to create and write the STAC Items.",
+    )
+    @click.option(
+        "--compact",
+        is_flag=True,
+        default=False,
+        help="Leave the class table out of the STAC Items.",
+    )
+    @click.option(
+        "--incremental",
+        is_flag=True,
+        default=False,
+        help="Only write the Items and Collections that changed since the last run.",
+    )
+    @click.option(
+        "--no-indent",
+        is_flag=True,
+        default=False,
+        help="Write compact JSON, without indentation or whitespace.",
+    )
+    @click.option(
+        "-s",
+        "--source-dir",
+        required=False,
+        help=("Local directory of archives, and the COGs created from them, to use as"
+              " the data assets, fingerprinted by --incremental."),
+    )
+    @click.option(
+        "--no-validate",
+        is_flag=True,
+        default=False,
+        help="Do not validate the saved Collections and Items.",
+    )
+    @click.option(
+        "--schema-cache",
+        required=False,
+        default=None,
+        help=("Directory of cached JSON schemas used to validate, on top of the bundled"
+              " STAC core schemas. Defaults to $NALCMS_SCHEMA_CACHE or"
+              " ~/.cache/stactools-nalcms/schemas."),
+    )
+    def create_collection_command(destination: str, workers: int, compact: bool,
+                                  incremental: bool, no_indent: bool,
+                                  source_dir: Optional[str], no_validate: bool,
+                                  schema_cache: Optional[str]) -> Any:
         """Creates a STAC Collection for each mapped dataset from the North
         American Land Classification Monitoring System.
         Args:
             destination (str): Directory used to store the STAC collections.
+            workers (int): Number of threads used to create and write the
+             STAC Items.
+            compact (bool): Leave the class table out of the STAC Items, it
+             is kept in the period Collections.
+            incremental (bool): Only write the Items whose inputs changed, and
+             the Collections whose JSON changed, since the last run.
+            no_indent (bool): Write compact JSON.
+            source_dir (str): Local directory of archives (`canada_2010.zip`)
+             and of the COGs created from them by `create-cogs`, to use as
+             the data assets of the Items that have one, see
+             `stac.find_source`. With `incremental`, Items are also
+             rewritten when their source file changes.
+            no_validate (bool): Skip the validation of the saved tree.
+            schema_cache (str): Directory of cached JSON schemas, see the
+             `validate` command. Validation never goes to the network, and
+             skips the schemas missing from the cache with a warning.
         """
-        root_col = stac.create_nalcms_collection()
+        with timing.stage("create_full_collection"):
+            root_col = stac.create_full_collection(workers, compact, source_dir)
+
+        with timing.stage("normalize_hrefs"):
+            root_col.normalize_hrefs(destination)
+        with timing.stage("save_collection"):
+            stac.save_collection(root_col, workers, incremental, indent=not no_indent)
+        if no_validate:
+            return
+        with timing.stage("validate"):
+            results = validate.validate_tree(root_col.self_href, schema_cache, True, workers)
+        failures = [result for result in results if result.error]
+        for result in failures:
+            print(f"FAILED {result.href}\n    {result.error}")
+        _warn_missing_schemas(results)
+        if failures:
+            raise click.ClickException(
+                f"{len(failures)} of {len(results)} objects failed validation, use --no-validate"
+                " to skip it")
+
+    @nalcms.command(
+        "create-items",
+        short_help="Creates all STAC Items, without Collections.",
+    )
+    @click.option(
+        "-o",
+        "--output",
+        required=False,
+        default="-",
+        help=("The output file for ndjson (default: stdout), or the output"
+              " directory for json."),
+    )
+    @click.option(
+        "-f",
+        "--format",
+        "output_format",
+        required=False,
+        type=click.Choice(["ndjson", "json"]),
+        default="ndjson",
+        help="One Item per line in a single file, or one json file per Item.",
+    )
+    @click.option(
+        "-p",
+        "--period",
+        required=False,
+        multiple=True,
+        type=click.Choice(list(PERIODS.keys())),
+        help="Only create the Items of this period. Can be repeated.",
+    )
+    @click.option("--compact",
+                  is_flag=True,
+                  default=False,
+                  help="Leave the class table out of the STAC Items.")
+    @click.option(
+        "-w",
+        "--workers",
+        required=False,
+        type=click.IntRange(min=1),
+        default=1,
+        help="Number of threads writing the json files.",
+    )
+    @click.option("--no-indent",
+                  is_flag=True,
+                  default=False,
+                  help="Write compact json files, without indentation or whitespace.")
+    def create_items_command(output: str, output_format: str, period: Tuple[str, ...],
+                             compact: bool, workers: int, no_indent: bool) -> None:
+        """Creates the STAC Items one at a time, without building the
+        Collection tree, and streams them to the output.
+
+        Args:
+            output (str): The output file for ndjson ("-" for stdout), or the
+             output directory for json.
+            output_format (str): "ndjson" or "json".
+            period (tuple): Only create the Items of these periods.
+            compact (bool): Leave the class table out of the STAC Items.
+            workers (int): Number of threads writing the json files.
+            no_indent (bool): Write compact json files. ndjson is always
+             compact.
+        """
+        items = stac.iter_items(list(period), compact)
+
+        if output_format == "ndjson":
+            with click.open_file(output, "w") as f:
+                count = stac.write_ndjson(items, f)
+        else:
+            if output == "-" or not os.path.isdir(output):
+                raise IOError(f'Destination folder "{output}" not found')
+            count = writer.write_objects(
+                ((item.to_dict(include_self_link=False), os.path.join(output, f"{item.id}.json"))
+                 for item in items), workers, not no_indent)
+
+        logger.info(f"Wrote {count} Items")
 
-        for per, years in PERIODS.items():
-            combos = it.product(REGIONS.keys(), GSDS, years)
-            period = stac.create_period_collection(per)
-            root_col.add_child(period)
+    @nalcms.command(
+        "export-parquet",
+        short_help="Export all STAC Items as a GeoParquet file.",
+    )
+    @click.option("-o", "--output", required=True, help="The GeoParquet file to write.")
+    @click.option("-s",
+                  "--source",
+                  required=False,
+                  default=None,
+                  help="A saved root STAC Collection json. Defaults to creating the Items.")
+    @click.option(
+        "-p",
+        "--period",
+        required=False,
+        multiple=True,
+        type=click.Choice(list(PERIODS.keys())),
+        help="Only create the Items of this period. Can be repeated.",
+    )
+    @click.option("--compact",
+                  is_flag=True,
+                  default=False,
+                  help="Leave the class table out of the created STAC Items.")
+    @click.option("--row-group-size",
+                  required=False,
+                  type=click.IntRange(min=1),
+                  default=None,
+                  help="Number of Items per Parquet row group (default: 1000).")
+    def export_parquet_command(output: str, source: Optional[str], period: Tuple[str, ...],
+                               compact: bool, row_group_size: Optional[int]) -> None:
+        """Writes every STAC Item, created one at a time or read from a
+        saved Collection, to a GeoParquet file with typed columns.
 
-            for reg, gsd, year in combos:
-                item = stac.create_item(reg, gsd, year, "")
-                if item is not None:
-                    period.add_item(item)
+        Args:
+            output (str): The GeoParquet file to write.
+            source (str): A saved root STAC Collection json, instead of
+             creating the Items.
+            period (tuple): Only create the Items of these periods.
+            compact (bool): Leave the class table out of the created Items.
+            row_group_size (int): Number of Items per row group.
+        """
+        # pyarrow is an optional dependency, only imported by this command
+        from stactools.nalcms import parquet
 
-        root_col.normalize_hrefs(destination)
-        root_col.save()
-        root_col.validate()
+        if source:
+            items: Iterable[Item] = Collection.from_file(source).get_all_items()
+        else:
+            items = stac.iter_items(list(period), compact)
+        count = parquet.write_parquet(items, output, row_group_size or parquet.ROW_GROUP_SIZE)
+        logger.info(f"Wrote {count} Items to {output}")
 
     @nalcms.command(
         "create-item",
@@ -66,7 +391,7 @@ def create_nalcms_command(cli: Any) -> Any:
         "-s",
         "--source",
         required=False,
-        help="The input COG to create the item from.",
+        help="The input COG, or CEC zip archive, to create the item from.",
         default=None,
     )
     @click.option("-r",
@@ -82,7 +407,16 @@ def create_nalcms_command(cli: Any) -> Any:
                   help="The year or range of years covered by the STAC Item.",
                   type=click.Choice(list(set(sum(YEARS.values(), [])))),
                   default="2010-2015")
-    def create_item_command(destination: str, source: str, region: str, gsd: str, year: str) -> Any:
+    @click.option("--compact",
+                  is_flag=True,
+                  default=False,
+                  help="Leave the class table out of the STAC Item.")
+    @click.option("--from-header",
+                  is_flag=True,
+                  default=False,
+                  help="Read the projection and raster metadata from the source's header.")
+    def create_item_command(destination: str, source: str, region: str, gsd: str, year: str,
+                            compact: bool, from_header: bool) -> Any:
         """Creates a STAC Item
 
         Args:
@@ -91,8 +425,11 @@ def create_nalcms_command(cli: Any) -> Any:
             region (str): The region covered by the STAC Item.
             gsd (int, float): The ground sampling distance of the STAC Item.
             year (str): The year or range of years covered by the STAC Item.
+            compact (bool): Leave the class table out of the STAC Item.
+            from_header (bool): Read the projection, footprint, nodata, data
+             type and file size from the source's header.
         """
-        item = stac.create_item(region, gsd, year, source)
+        item = stac.create_item(region, gsd, year, source, compact, from_header)
         if item:
             item_path = os.path.join(destination, f"{item.id}.json")
             item.set_self_href(item_path)
@@ -100,27 +437,508 @@ def create_nalcms_command(cli: Any) -> Any:
         else:
             print(f"{gsd}m_{year}_{region} not found in NALCMS")
 
+    @nalcms.command(
+        "compute-stats",
+        short_help="Add the pixel count and area of each class to a STAC Item.",
+    )
+    @click.option("-i", "--item", "item_path", required=True, help="The STAC Item json to update.")
+    @click.option("-s",
+                  "--source",
+                  required=False,
+                  default=None,
+                  help="The COG to count, defaults to the Item's data asset.")
+    @click.option("-w",
+                  "--workers",
+                  required=False,
+                  type=click.IntRange(min=1),
+                  default=1,
+                  help="Number of threads reading the COG.")
+    def compute_stats_command(item_path: str, source: Optional[str], workers: int) -> None:
+        """Counts the pixels of each land cover class in a COG, block by
+        block, and saves the counts and areas in the Item's
+        `label:overviews`.
+
+        Args:
+            item_path (str): The STAC Item json to update.
+            source (str): The COG to count, defaults to the Item's data
+             asset.
+            workers (int): Number of threads reading the COG.
+        """
+        item = Item.from_file(item_path)
+        source = source or item.assets["data"].get_absolute_href()
+        if source is None:
+            raise click.ClickException(f"{item_path} has no data asset HREF")
+        class_stats = stats.class_stats(source, workers)
+        stac.add_class_stats(item, class_stats)
+        item.save_object()
+
+    @nalcms.command(
+        "compute-transitions",
+        short_help="Compute the land cover transition matrix.",
+    )
+    @click.option("-c", "--change", required=False, default=None, help="A change COG.")
+    @click.option("-b",
+                  "--before",
+                  required=False,
+                  default=None,
+                  help="The earlier yearly COG, instead of a change COG.")
+    @click.option("-a",
+                  "--after",
+                  required=False,
+                  default=None,
+                  help="The later yearly COG, instead of a change COG.")
+    @click.option("-o",
+                  "--output",
+                  required=False,
+                  default=None,
+                  help="The json file to write the matrix to.")
+    @click.option("-i",
+                  "--item",
+                  "item_path",
+                  required=False,
+                  default=None,
+                  help="A change STAC Item json to add the transition counts to.")
+    @click.option("-w",
+                  "--workers",
+                  required=False,
+                  type=click.IntRange(min=1),
+                  default=1,
+                  help="Number of threads reading the COGs.")
+    def compute_transitions_command(change: Optional[str], before: Optional[str],
+                                    after: Optional[str], output: Optional[str],
+                                    item_path: Optional[str], workers: int) -> None:
+        """Computes the 19x19 matrix of pixel counts and areas of the
+        transitions between land cover classes, from a change COG or from two
+        yearly COGs, and writes it to a json file and/or adds it to a change
+        Item's `label:overviews`.
+
+        Args:
+            change (str): A change COG.
+            before (str): The earlier yearly COG, instead of a change COG.
+            after (str): The later yearly COG, instead of a change COG.
+            output (str): The json file to write the matrix to.
+            item_path (str): A change STAC Item json to add the counts to.
+            workers (int): Number of threads reading the COGs.
+        """
+        if change is None and (before is None or after is None):
+            raise click.UsageError("Use --change, or --before and --after")
+        if output is None and item_path is None:
+            raise click.UsageError("Use --output and/or --item")
+
+        matrix = stats.transition_matrix(change, before, after, workers)
+
+        if output:
+            with open(output, "w") as f:
+                json.dump(matrix.to_dict(), f, indent=2)
+        if item_path:
+            item = Item.from_file(item_path)
+            stac.add_class_stats(item, matrix.to_class_stats())
+            item.save_object()
+
+    @nalcms.command(
+        "validate",
+        short_help="Validate a STAC Collection and everything below it.",
+    )
+    @click.option("-s",
+                  "--source",
+                  required=True,
+                  help="The root STAC Collection json, e.g. from create-collection.")
+    @click.option("-w",
+                  "--workers",
+                  required=False,
+                  type=click.IntRange(min=1),
+                  default=1,
+                  help="Number of threads used to validate.")
+    @click.option("--schema-cache",
+                  required=False,
+                  default=None,
+                  help=("Directory of cached JSON schemas, on top of the bundled STAC core"
+                        " schemas. Defaults to $NALCMS_SCHEMA_CACHE or"
+                        " ~/.cache/stactools-nalcms/schemas."))
+    @click.option("--online",
+                  is_flag=True,
+                  default=False,
+                  help="Fetch schemas missing from the cache and add them to it.")
+    def validate_command(source: str, workers: int, schema_cache: str, online: bool) -> None:
+        """Validates a STAC Collection and all its children and Items
+        against locally cached JSON schemas, and reports the time taken and
+        any failure for each of them.
+
+        Args:
+            source (str): The root STAC Collection json.
+            workers (int): Number of threads used to validate.
+            schema_cache (str): Directory of cached JSON schemas.
+            online (bool): Fetch schemas missing from the cache.
+        """
+        results = validate.validate_tree(source, schema_cache, not online, workers)
+
+        for result in results:
+            status = "FAILED" if result.error else "OK"
+            print(f"{status} {result.seconds:.3f}s {result.href}")
+            if result.error:
+                print(f"    {result.error}")
+
+        failures = [result for result in results if result.error]
+        print(f"{len(results) - len(failures)} of {len(results)} objects are valid")
+        _warn_missing_schemas(results)
+        if failures:
+            raise click.ClickException(f"{len(failures)} objects failed validation")
+
+    @nalcms.command(
+        "verify-assets",
+        short_help="Check that the remote data and metadata files exist.",
+    )
+    @click.option("--href-dir",
+                  required=False,
+                  default=HREF_DIR,
+                  help="The base URL of the files, defaults to the CEC server.")
+    @click.option("-c",
+                  "--concurrency",
+                  required=False,
+                  type=click.IntRange(min=1),
+                  default=8,
+                  help="Maximum number of open connections.")
+    @click.option("--rate",
+                  required=False,
+                  type=click.FloatRange(min=0),
+                  default=10.0,
+                  help="Maximum number of requests per second, 0 for no limit.")
+    @click.option("--timeout",
+                  required=False,
+                  type=click.FloatRange(min=0),
+                  default=60.0,
+                  help="Timeout of each check in seconds.")
+    @click.option("-o", "--output", required=False, default=None, help="Write a JSON report.")
+    def verify_assets_command(href_dir: str, concurrency: int, rate: float, timeout: float,
+                              output: Optional[str]) -> None:
+        """Sends a HEAD (or one byte range) request for every remote data
+        archive and metadata document, and reports missing files, sizes and
+        latency.
+
+        Args:
+            href_dir (str): The base URL of the files.
+            concurrency (int): Maximum number of open connections.
+            rate (float): Maximum number of requests per second.
+            timeout (float): Timeout of each check in seconds.
+            output (str): Optional JSON report.
+        """
+        checks = verify.verify_assets(href_dir, concurrency, rate or None, timeout)
+
+        for check in checks:
+            if check.missing:
+                print(f"MISSING {check.seconds:.3f}s {check.asset.href} ({check.error})")
+            else:
+                print(f"OK {check.seconds:.3f}s {check.asset.href} ({check.size} bytes)")
+
+        if output:
+            with open(output, "w") as f:
+                json.dump([check.to_dict() for check in checks], f, indent=2)
+
+        problems = [check for check in checks if not check.ok]
+        print(f"{len(checks) - len(problems)} of {len(checks)} remote assets are OK")
+        if problems:
+            raise click.ClickException(f"{len(problems)} remote assets are missing")
+
+    @nalcms.command(
+        "download",
+        short_help="Download the source archives, each one once.",
+    )
+    @click.option("-d",
+                  "--destination",
+                  required=False,
+                  default=None,
+                  help="Directory to place the archives in, in addition to the cache.")
+    @click.option("-p",
+                  "--period",
+                  required=False,
+                  multiple=True,
+                  type=click.Choice(list(PERIODS.keys())),
+                  help="Only the archives of this period. Can be repeated.")
+    @click.option("-r",
+                  "--region",
+                  required=False,
+                  multiple=True,
+                  type=click.Choice(list(REGIONS.keys())),
+                  help="Only the archives of this region. Can be repeated.")
+    @click.option("-g",
+                  "--gsd",
+                  required=False,
+                  multiple=True,
+                  type=click.Choice(GSDS),
+                  help="Only the archives of this GSD. Can be repeated.")
+    @click.option("-w",
+                  "--workers",
+                  required=False,
+                  type=click.IntRange(min=1),
+                  default=4,
+                  help="Number of parallel range requests per archive.")
+    @click.option("--cache",
+                  "cache_dir",
+                  required=False,
+                  default=None,
+                  help=("Directory of downloaded archives. Defaults to $NALCMS_DOWNLOAD_CACHE"
+                        " or ~/.cache/stactools-nalcms/archives."))
+    @click.option("--href-dir",
+                  required=False,
+                  default=HREF_DIR,
+                  help="The base URL of the archives, defaults to the CEC server.")
+    def download_command(destination: Optional[str], period: Tuple[str, ...],
+                         region: Tuple[str, ...], gsd: Tuple[str, ...], workers: int,
+                         cache_dir: Optional[str], href_dir: str) -> None:
+        """Downloads the source archives of the selected products once each,
+        with parallel range requests, resuming partial downloads and skipping
+        the archives already in the download cache.
+
+        Args:
+            destination (str): Directory to place the archives in.
+            period (tuple): Only the archives of these periods.
+            region (tuple): Only the archives of these regions.
+            gsd (tuple): Only the archives of these GSDs.
+            workers (int): Number of parallel range requests per archive.
+            cache_dir (str): Directory of downloaded archives.
+            href_dir (str): The base URL of the archives.
+        """
+        results = download.download_archives(destination, cache_dir, href_dir, period, region,
+                                             gsd, workers)
+        for result in results:
+            status = "CACHED" if result.cached else "DOWNLOADED"
+            print(f"{status} {result.seconds:.1f}s {result.path}")
+        print(f"{len(results)} archives, {sum(r.downloaded for r in results)} bytes downloaded")
+
     @nalcms.command(
         "create-cog",
         short_help="Transform Geotiff to Cloud-Optimized Geotiff.",
     )
     @click.option("-d", "--destination", required=True, help="The output directory for the COG")
-    @click.option("-s", "--source", required=True, help="Path to an input GeoTiff")
-    def create_cog_command(destination: str, source: str) -> None:
+    @click.option("-s",
+                  "--source",
+                  required=True,
+                  help="Path to an input GeoTiff, or a zip archive holding it")
+    @cog_options
+    def create_cog_command(destination: str, source: str, **cog_kwargs: Any) -> None:
         """Generate a COG from a GeoTiff. The COG will be saved in the desination
         with `_cog.tif` appended to the name.
 
         Args:
             destination (str): Local directory to save output COGs
-            source (str): An input NALCMS Landcover GeoTiff
+            source (str): An input NALCMS Landcover GeoTiff, or zip archive
+            cog_kwargs: The COG profile and creation options, see
+             `cog_options`
         """
-        if not os.path.isdir(destination):
-            raise IOError(f'Destination folder "{destination}" not found')
+        cog.create_cog(source, destination, get_cog_args(**cog_kwargs))
+
+    @nalcms.command(
+        "create-cogs",
+        short_help="Transform many Geotiffs to Cloud-Optimized Geotiffs.",
+    )
+    @click.option("-d", "--destination", required=True, help="The output directory for the COGs")
+    @click.option("-s",
+                  "--source",
+                  required=True,
+                  help="A directory of GeoTiffs, or a file listing one GeoTiff per line")
+    @click.option("-w",
+                  "--workers",
+                  required=False,
+                  type=click.IntRange(min=1),
+                  default=1,
+                  help="Number of conversions run at the same time.")
+    @cog_options
+    def create_cogs_command(destination: str, source: str, workers: int,
+                            **cog_kwargs: Any) -> None:
+        """Generate COGs from many GeoTiffs, skipping the ones already
+        converted. Run it again to resume an interrupted conversion. A
+        summary is saved in the destination as `create-cogs-summary.json`.
 
-        output_path = os.path.join(destination, os.path.basename(source)[:-4] + "_cog.tif")
+        Args:
+            destination (str): Local directory to save output COGs
+            source (str): A directory of GeoTiffs, or a file listing them
+            workers (int): Number of conversions run at the same time
+            cog_kwargs: The COG profile and creation options, see
+             `cog_options`
+        """
+        results = cog.create_cogs(cog.list_sources(source), destination, workers,
+                                  get_cog_args(**cog_kwargs))
 
-        args = ["-co", "OVERVIEWS=IGNORE_EXISTING"]
+        for result in results:
+            print(f"{result.status} {result.seconds:.1f}s "
+                  f"{result.bytes_per_second / 1e6:.1f} MB/s {result.source}")
 
-        cogify(source, output_path, args)
+        failures = [result for result in results if result.status == "failed"]
+        if failures:
+            raise click.ClickException(f"{len(failures)} of {len(results)} conversions failed")
 
-    return nalcms
+    @nalcms.command(
+        "create-change-cog",
+        short_help="Create a change COG from two yearly land cover COGs.",
+    )
+    @click.option("-d", "--destination", required=True, help="The output directory for the COG")
+    @click.option("-b", "--before", required=True, help="The earlier yearly land cover COG")
+    @click.option("-a", "--after", required=True, help="The later yearly land cover COG")
+    @click.option("-n", "--name", required=False, default=None, help="Name of the output COG")
+    @click.option("-w",
+                  "--workers",
+                  required=False,
+                  type=click.IntRange(min=1),
+                  default=1,
+                  help="Number of threads encoding blocks.")
+    @cog_options
+    def create_change_cog_command(destination: str, before: str, after: str,
+                                  name: Optional[str], workers: int, **cog_kwargs: Any) -> None:
+        """Generate a land cover change COG, with the `before * 100 + after`
+        codes of the change products, from two yearly COGs on the same grid.
+
+        Args:
+            destination (str): Local directory to save the output COG
+            before (str): The earlier yearly land cover COG
+            after (str): The later yearly land cover COG
+            name (str): Name of the output COG, `_cog.tif` is appended
+            workers (int): Number of threads encoding blocks
+            cog_kwargs: The COG profile and creation options, see
+             `cog_options`
+        """
+        output_path = change.create_change_cog(before, after, destination, name, workers,
+                                               get_cog_args(**cog_kwargs))
+        print(output_path)
+
+    @nalcms.command(
+        "create-datacube",
+        short_help="Stack yearly land cover COGs into a chunked Zarr datacube.",
+    )
+    @click.option("-o", "--output", required=True, help="The Zarr store to write.")
+    @click.option("-i",
+                  "--input",
+                  "inputs",
+                  required=True,
+                  multiple=True,
+                  nargs=2,
+                  type=(click.Choice(PERIODS["yearly"]), str),
+                  help="A year and its land cover COG, e.g. `-i 2010 canada_2010_cog.tif`."
+                  " Repeat for each year.")
+    @click.option("-r",
+                  "--region",
+                  required=True,
+                  type=click.Choice(list(REGIONS.keys())),
+                  help="The region of the COGs.")
+    @click.option("-g", "--gsd", required=False, type=click.Choice(GSDS), default="30")
+    @click.option("-w",
+                  "--workers",
+                  required=False,
+                  type=click.IntRange(min=1),
+                  default=1,
+                  help="Number of threads reading and writing chunks.")
+    @click.option("--chunk-size",
+                  required=False,
+                  type=click.IntRange(min=16),
+                  default=512,
+                  help="Width and height of the chunks in pixels.")
+    def create_datacube_command(output: str, inputs: Tuple[Tuple[str, str], ...], region: str,
+                                gsd: str, workers: int, chunk_size: int) -> None:
+        """Stacks the yearly land cover COGs of a region, on the same grid,
+        into a (time, y, x) Zarr store chunked for pixel-history reads.
+
+        Args:
+            output (str): The Zarr store to write.
+            inputs (tuple): (year, COG) pairs.
+            region (str): The region of the COGs.
+            gsd (str): The GSD of the COGs.
+            workers (int): Number of threads reading and writing chunks.
+            chunk_size (int): Width and height of the chunks.
+        """
+        # zarr is an optional dependency, only imported by this command
+        from stactools.nalcms import datacube
+
+        datacube.create_datacube(list(inputs), output, region, gsd, workers, chunk_size)
+        print(output)
+
+    @nalcms.command(
+        "serve-tiles",
+        short_help="Serve XYZ PNG tiles of a COG for local development.",
+    )
+    @click.option("-s", "--source", required=True, help="The land cover or change COG.")
+    @click.option("--change",
+                  is_flag=True,
+                  default=False,
+                  help="Color the `before * 100 + after` codes of a change COG.")
+    @click.option("--host", required=False, default="127.0.0.1", help="The address to listen on.")
+    @click.option("-p", "--port", required=False, type=int, default=8000, help="The port.")
+    @click.option("--cache-size",
+                  required=False,
+                  type=click.IntRange(min=0),
+                  default=64,
+                  help="Maximum size of the tile cache in MB.")
+    def serve_tiles_command(source: str, change: bool, host: str, port: int,
+                            cache_size: int) -> None:
+        """Serves web mercator `/{z}/{x}/{y}.png` tiles of a COG, colored with
+        the NALCMS class palette, and the tile cache counters at `/stats`.
+
+        Args:
+            source (str): The land cover or change COG.
+            change (bool): The COG holds change codes.
+            host (str): The address to listen on.
+            port (int): The port to listen on.
+            cache_size (int): Maximum size of the tile cache in MB.
+        """
+        renderer = tiles.TileRenderer(source, "change" if change else "classes",
+                                      cache_size * 1024 * 1024)
+        server = tiles.tile_server(renderer, host, port)
+        print(f"Serving tiles of {source} at http://{host}:{port}/{{z}}/{{x}}/{{y}}.png")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            renderer.close()
+
+    @nalcms.command(
+        "subset",
+        short_help="Cut a region's COG and STAC Item out of the North America mosaic.",
+    )
+    @click.option("-d",
+                  "--destination",
+                  required=True,
+                  help="The output directory for the COG and STAC Item json")
+    @click.option("-s",
+                  "--source",
+                  required=True,
+                  help="The North America GeoTIFF, COG or zip archive of the same GSD and year")
+    @click.option("-r",
+                  "--region",
+                  required=True,
+                  type=click.Choice(subset.SUBSET_REGIONS),
+                  help="The region to cut out.")
+    @click.option("-g", "--gsd", required=False, type=click.Choice(GSDS), default="30")
+    @click.option("-y",
+                  "--year",
+                  required=True,
+                  help="The year or range of years of the source.",
+                  type=click.Choice(list(set(sum(YEARS.values(), [])))))
+    @click.option("--compact",
+                  is_flag=True,
+                  default=False,
+                  help="Leave the class table out of the STAC Item.")
+    @cog_options
+    def subset_command(destination: str, source: str, region: str, gsd: str, year: str,
+                       compact: bool, **cog_kwargs: Any) -> None:
+        """Cuts a region's COG out of the North America mosaic, within the
+        projected bounds of the region's product, in a single gdal_translate
+        pass, and creates its STAC Item.
+
+        Args:
+            destination (str): Local directory to save the COG and Item
+            source (str): The North America raster of the same GSD and year
+            region (str): The region to cut out
+            gsd (str): The GSD of the source
+            year (str): The year or range of years of the source
+            compact (bool): Leave the class table out of the STAC Item
+            cog_kwargs: The COG profile and creation options, see
+             `cog_options`
+        """
+        output_path = subset.create_subset_cog(source, region, gsd, year, destination,
+                                               get_cog_args(**cog_kwargs))
+        item = stac.create_item(region, gsd, year, output_path, compact)
+        if item is None:
+            raise click.ClickException(f"{gsd}m_{year}_{region} not found in NALCMS")
+        item.set_self_href(os.path.join(destination, f"{item.id}.json"))
+        item.save_object()
+        print(output_path)
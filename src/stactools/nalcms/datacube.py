@@ -0,0 +1,168 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.transform import Affine, rowcol
+from rasterio.windows import Window
+
+from stactools.nalcms import cog
+from stactools.nalcms.constants import PERIODS, VALUES
+from stactools.nalcms.products import get_product
+
+try:
+    import zarr
+except ImportError:  # pragma: no cover
+    zarr = None
+
+# Nodata of the datacube, not a land cover class; the yearly products have
+# different nodata values and data types
+CUBE_NODATA = 0
+CHUNK_SIZE = 512
+VARIABLE = "land_cover"
+
+
+def _require_zarr() -> None:
+    if zarr is None:
+        raise ImportError("Creating a datacube requires zarr, install it with"
+                          " `pip install stactools-nalcms[datacube]`")
+
+
+def normalize_classes(data: np.ndarray, nodata: Optional[float] = None) -> np.ndarray:
+    """Returns land cover codes as uint8, with nodata and any value that is
+     not a class of `VALUES` set to `CUBE_NODATA`.
+    """
+    data = data.astype(np.int32)
+    valid = (data >= 1) & (data <= max(VALUES))
+    if nodata is not None:
+        valid &= data != nodata
+    return np.where(valid, data, CUBE_NODATA).astype(np.uint8)
+
+
+def create_datacube(sources: Sequence[Tuple[str, str]],
+                    output: str,
+                    region: str,
+                    gsd: str,
+                    workers: int = 1,
+                    chunk_size: int = CHUNK_SIZE) -> Any:
+    """Stacks yearly land cover rasters on the same grid into a chunked
+     (time, y, x) Zarr store and returns its `zarr.Group`.
+
+    The `land_cover` array is chunked over the full time axis and
+     `chunk_size` pixels along y and x, so the whole history of a pixel is
+     read from one chunk. Chunks are read and written by `workers` threads,
+     each with its own dataset handles. `time`, `y` and `x` coordinate arrays
+     and `_ARRAY_DIMENSIONS` attributes make the store readable by xarray.
+     The `VALUES` legend and the `NODATA` of each yearly product are stored as
+     attributes; class codes are stored as uint8 with nodata `CUBE_NODATA`.
+
+    Args:
+        sources (list): (year, raster) pairs of yearly products, see
+         `cog.vsi_path`.
+        output (str): Path of the Zarr store to write.
+        region (str): The region of the products.
+        gsd (str): The GSD of the products.
+        workers (int): Number of threads reading and writing chunks.
+        chunk_size (int): Width and height of the chunks.
+    """
+    _require_zarr()
+    sources = sorted(sources)
+    years = [year for year, _ in sources]
+    if len(set(years)) != len(years):
+        raise ValueError(f"Duplicate years in {years}")
+
+    source_nodata: Dict[str, Optional[float]] = {}
+    for year, _ in sources:
+        product = get_product(region, str(gsd), year)
+        if year not in PERIODS["yearly"] or product is None:
+            raise ValueError(f"No yearly {region} product for {gsd}m {year}")
+        source_nodata[year] = product.nodata
+
+    paths = [cog.vsi_path(source) for _, source in sources]
+    with rasterio.open(paths[0]) as first:
+        transform, crs, shape = first.transform, first.crs, first.shape
+        for path in paths[1:]:
+            with rasterio.open(path) as src:
+                if src.shape != shape or src.transform != transform or src.crs != crs:
+                    raise ValueError(f'"{path}" is not on the grid of "{paths[0]}"')
+    height, width = shape
+
+    root = zarr.open_group(output, mode="w")
+    root.attrs.update({
+        "region": region,
+        "gsd": float(gsd),
+        "years": years,
+        "crs": crs.to_wkt() if crs else None,
+        "transform": list(transform)[:6],
+        "nodata": CUBE_NODATA,
+        "source_nodata": source_nodata,
+        "legend": {str(code): name
+                   for code, name in VALUES.items()},
+    })
+
+    time = root.create_dataset("time",
+                               data=np.array([f"{year}-01-01" for year in years],
+                                             dtype="datetime64[D]"))
+    time.attrs["_ARRAY_DIMENSIONS"] = ["time"]
+    y = root.create_dataset("y", data=transform.f + transform.e * (np.arange(height) + 0.5))
+    y.attrs["_ARRAY_DIMENSIONS"] = ["y"]
+    x = root.create_dataset("x", data=transform.c + transform.a * (np.arange(width) + 0.5))
+    x.attrs["_ARRAY_DIMENSIONS"] = ["x"]
+
+    cube = root.create_dataset(VARIABLE,
+                               shape=(len(years), height, width),
+                               chunks=(len(years), chunk_size, chunk_size),
+                               dtype="uint8",
+                               fill_value=CUBE_NODATA)
+    cube.attrs.update({
+        "_ARRAY_DIMENSIONS": ["time", "y", "x"],
+        "nodata": CUBE_NODATA,
+        "legend": root.attrs["legend"],
+    })
+
+    windows = [
+        Window(col, row, min(chunk_size, width - col), min(chunk_size, height - row))
+        for row in range(0, height, chunk_size) for col in range(0, width, chunk_size)
+    ]
+
+    local = threading.local()
+    handles: List[Any] = []
+    lock = threading.Lock()
+
+    def write(window: Window) -> None:
+        if not hasattr(local, "datasets"):
+            local.datasets = [rasterio.open(path) for path in paths]
+            with lock:
+                handles.extend(local.datasets)
+        block = np.stack([
+            normalize_classes(dataset.read(1, window=window), source_nodata[year])
+            for year, dataset in zip(years, local.datasets)
+        ])
+        # Each window is one chunk, so threads never write the same chunk
+        cube[:, window.row_off:window.row_off + window.height,
+             window.col_off:window.col_off + window.width] = block
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(write, window) for window in windows]:
+                future.result()
+    finally:
+        for handle in handles:
+            handle.close()
+
+    return root
+
+
+def read_pixel_history(store: str, x: float, y: float) -> Dict[str, int]:
+    """Returns the land cover code of each year at projected coordinates
+     (x, y) of a datacube written by `create_datacube`, reading a single
+     chunk. Nodata is `CUBE_NODATA`.
+    """
+    _require_zarr()
+    root = zarr.open_group(store, mode="r")
+    row, col = rowcol(Affine(*root.attrs["transform"]), x, y)
+    cube = root[VARIABLE]
+    if not (0 <= row < cube.shape[1] and 0 <= col < cube.shape[2]):
+        raise ValueError(f"({x}, {y}) is outside the datacube")
+    return dict(zip(root.attrs["years"], (int(v) for v in cube[:, row, col])))
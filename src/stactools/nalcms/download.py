@@ -0,0 +1,276 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import requests
+
+from stactools.nalcms.constants import HREF_DIR, PERIODS
+from stactools.nalcms.products import Product, archives
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CACHE_ENV = "NALCMS_DOWNLOAD_CACHE"
+DEFAULT_DOWNLOAD_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "stactools-nalcms",
+                                      "archives")
+CHUNK_SIZE = 32 * 1024 * 1024
+TIMEOUT = 60
+
+
+def download_cache_dir(directory: Optional[str] = None) -> str:
+    """Returns the download cache directory: `directory` if given, else the
+     `NALCMS_DOWNLOAD_CACHE` environment variable, else
+     `~/.cache/stactools-nalcms/archives`.
+    """
+    return directory or os.environ.get(DOWNLOAD_CACHE_ENV) or DEFAULT_DOWNLOAD_CACHE
+
+
+class Download(NamedTuple):
+    """The outcome of fetching one source archive.
+
+    `cached` is True when the archive was already complete in the cache and
+     nothing was requested from the server.
+    """
+    href: str
+    path: str
+    products: List[str]
+    size: int
+    downloaded: int
+    cached: bool
+    seconds: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+def select_archives(periods: Optional[Iterable[str]] = None,
+                    regions: Optional[Iterable[str]] = None,
+                    gsds: Optional[Iterable[str]] = None) -> Dict[str, List[Product]]:
+    """Returns the unique source archives of the selected products, with the
+     products using each of them.
+
+    Args:
+        periods (list): Only the products of these periods, e.g. ["yearly"].
+        regions (list): Only the products of these regions, e.g. ["CAN"].
+        gsds (list): Only the products of these GSDs, e.g. ["30"].
+    """
+    years: Optional[Set[str]] = None
+    if periods:
+        years = {year for period in periods for year in PERIODS[period]}
+    selected = {}
+    for href, products in archives().items():
+        products = [
+            p for p in products if (years is None or p.year in years) and (
+                not regions or p.region in regions) and (not gsds or p.gsd in gsds)
+        ]
+        if products:
+            selected[href] = products
+    return selected
+
+
+def _write_state(path: str, state: Dict[str, Any]) -> None:
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        try:
+            return dict(json.load(f))
+        except ValueError:
+            return None
+
+
+def _remote_file(session: requests.Session, url: str) -> Tuple[int, Optional[str], bool]:
+    """Returns the size, validator (ETag or Last-Modified) and range support
+     of a remote file.
+    """
+    response = session.head(url, allow_redirects=True, timeout=TIMEOUT)
+    if response.status_code in (403, 405, 501) or "Content-Length" not in response.headers:
+        response = session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=TIMEOUT)
+        response.close()
+    response.raise_for_status()
+
+    validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+    if response.status_code == 206:
+        size = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+        return size, validator, True
+    return (int(response.headers["Content-Length"]), validator,
+            response.headers.get("Accept-Ranges") == "bytes")
+
+
+def download_file(url: str,
+                  path: str,
+                  workers: int = 4,
+                  chunk_size: int = CHUNK_SIZE) -> Tuple[int, int]:
+    """Downloads a file with `workers` parallel range requests and returns
+     its size and the number of bytes downloaded.
+
+    The file is written to `<path>.part`, and the chunks completed so far are
+     recorded in `<path>.part.json`, so an interrupted download resumes where
+     it stopped, unless the remote file or the chunk size changed. The file is
+     only moved to `path` once every chunk is recorded as written, or, for
+     servers without range support, downloaded with a single request, once
+     as many bytes as the server reported were received.
+
+    Args:
+        url (str): The URL of the file.
+        path (str): The local path of the file.
+        workers (int): Number of parallel range requests.
+        chunk_size (int): Size of each range request in bytes.
+    """
+    part_path = path + ".part"
+    state_path = part_path + ".json"
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    local = threading.local()
+
+    def session() -> requests.Session:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        result: requests.Session = local.session
+        return result
+
+    size, validator, ranges = _remote_file(session(), url)
+
+    state = _read_json(state_path)
+    if (state is None or state.get("url") != url or state.get("size") != size
+            or state.get("validator") != validator or state.get("chunk_size") != chunk_size
+            or not os.path.isfile(part_path)):
+        state = {
+            "url": url,
+            "size": size,
+            "validator": validator,
+            "chunk_size": chunk_size,
+            "done": []
+        }
+        with open(part_path, "wb") as f:
+            f.truncate(size)
+        _write_state(state_path, state)
+
+    # The .part file is preallocated to the full size, so its size says
+    # nothing about what was written
+    downloaded = 0
+    if not ranges:
+        with session().get(url, stream=True, timeout=TIMEOUT) as response:
+            response.raise_for_status()
+            with open(part_path, "wb") as f:
+                for block in response.iter_content(1024 * 1024):
+                    f.write(block)
+                    downloaded += len(block)
+    else:
+        done = set(state["done"])
+        chunks = (size + chunk_size - 1) // chunk_size
+        todo = [i for i in range(chunks) if i not in done]
+        lock = threading.Lock()
+
+        def fetch(index: int) -> int:
+            start = index * chunk_size
+            end = min(start + chunk_size, size) - 1
+            response = session().get(url,
+                                     headers={"Range": f"bytes={start}-{end}"},
+                                     timeout=TIMEOUT)
+            response.raise_for_status()
+            content = response.content
+            if response.status_code != 206 or len(content) != end - start + 1:
+                raise IOError(f"Invalid range response for {url} bytes {start}-{end}")
+            with open(part_path, "r+b") as f:
+                f.seek(start)
+                f.write(content)
+            with lock:
+                done.add(index)
+                state["done"] = sorted(done)
+                _write_state(state_path, state)
+            return end - start + 1
+
+        if todo:
+            logger.info(f"Downloading {len(todo)} of {chunks} chunks of {url}")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            downloaded = sum(executor.map(fetch, todo))
+
+        if len(done) != chunks:
+            raise IOError(f"Downloaded {len(done)} of {chunks} chunks of {url}")
+
+    if not ranges and downloaded != size:
+        raise IOError(f"Downloaded {downloaded} bytes of {url}, expected {size}")
+    os.replace(part_path, path)
+    os.remove(state_path)
+    return size, downloaded
+
+
+def download_archives(destination: Optional[str] = None,
+                      cache_dir: Optional[str] = None,
+                      href_dir: str = HREF_DIR,
+                      periods: Optional[Iterable[str]] = None,
+                      regions: Optional[Iterable[str]] = None,
+                      gsds: Optional[Iterable[str]] = None,
+                      workers: int = 4,
+                      chunk_size: int = CHUNK_SIZE) -> List[Download]:
+    """Downloads the source archives of the selected products, each one once
+     even when several products share it.
+
+    Archives are kept in the download cache (see `download_cache_dir`) under
+     their path on the server, with a `<archive>.json` record written once
+     complete; cached archives are never requested again. With a
+     `destination`, the archives are also linked (or copied) there, side by
+     side, ready for `create-cogs`.
+
+    Args:
+        destination (str): Optional directory to place the archives in.
+        cache_dir (str): The download cache directory.
+        href_dir (str): The base URL of the archives, `constants.HREF_DIR` by
+         default.
+        periods (list): Only the archives of these periods.
+        regions (list): Only the archives of these regions.
+        gsds (list): Only the archives of these GSDs.
+        workers (int): Number of parallel range requests per archive.
+        chunk_size (int): Size of each range request in bytes.
+    """
+    cache_dir = download_cache_dir(cache_dir)
+    base = href_dir.rstrip("/") + "/"
+    results = []
+    for href, products in select_archives(periods, regions, gsds).items():
+        url = base + href
+        path = os.path.join(cache_dir, *href.split("/"))
+        record_path = path + ".json"
+        start = time.perf_counter()
+
+        record = _read_json(record_path)
+        cached = (record is not None and record.get("url") == url and os.path.isfile(path)
+                  and os.path.getsize(path) == record.get("size"))
+        if cached:
+            size, downloaded = os.path.getsize(path), 0
+        else:
+            size, downloaded = download_file(url, path, workers, chunk_size)
+            _write_state(record_path, {"url": url, "size": size})
+
+        if destination:
+            target = os.path.join(destination, os.path.basename(path))
+            if not (os.path.isfile(target) and os.path.getsize(target) == size):
+                os.makedirs(destination, exist_ok=True)
+                if os.path.exists(target):
+                    os.remove(target)
+                try:
+                    os.link(path, target)
+                except OSError:
+                    shutil.copyfile(path, target)
+            path = target
+
+        results.append(
+            Download(href=url,
+                     path=path,
+                     products=[p.id for p in products],
+                     size=size,
+                     downloaded=downloaded,
+                     cached=cached,
+                     seconds=time.perf_counter() - start))
+    return results
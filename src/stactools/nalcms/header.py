@@ -0,0 +1,112 @@
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import fsspec
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+from rasterio.warp import transform as transform_coords
+
+from stactools.nalcms.cog import source_file, vsi_path
+
+WGS84 = CRS.from_epsg(4326)
+
+
+class RasterHeader(NamedTuple):
+    """The metadata of a raster needed by a STAC Item, in STAC form."""
+    epsg: Optional[int]
+    wkt2: str
+    transform: List[float]
+    shape: List[int]
+    bounds: List[float]
+    nodata: Optional[float]
+    data_type: str
+    file_size: int
+    bbox: List[float]
+    geometry: Dict[str, Any]
+
+
+def footprint(bounds: Tuple[float, float, float, float],
+              crs: CRS,
+              densify: int = 21) -> Tuple[List[float], Dict[str, Any]]:
+    """Returns the WGS84 bbox and polygon of projected bounds.
+
+    Each edge is densified with `densify` points and all the points are
+     transformed in a single call, so the curved edges of the projected
+     rectangle are followed.
+
+    Args:
+        bounds (tuple): (left, bottom, right, top) in `crs`.
+        crs (CRS): The CRS of the bounds.
+        densify (int): Number of points per edge.
+    """
+    left, bottom, right, top = bounds
+    steps = np.linspace(0, 1, densify, endpoint=False)
+    xs = np.concatenate([
+        left + (right - left) * steps,
+        np.full(densify, right),
+        right - (right - left) * steps,
+        np.full(densify, left),
+    ])
+    ys = np.concatenate([
+        np.full(densify, bottom),
+        bottom + (top - bottom) * steps,
+        np.full(densify, top),
+        top - (top - bottom) * steps,
+    ])
+    lons, lats = transform_coords(crs, WGS84, xs.tolist(), ys.tolist())
+
+    coordinates = [[lon, lat] for lon, lat in zip(lons, lats)]
+    coordinates.append(coordinates[0])
+    bbox = [min(lons), min(lats), max(lons), max(lats)]
+    return bbox, {"type": "Polygon", "coordinates": [coordinates]}
+
+
+def _file_key(source: str) -> Tuple[int, Any]:
+    """Returns the (size, modification time) of the file a source is read
+     from.
+    """
+    fs, path = fsspec.core.url_to_fs(source_file(source))
+    info = fs.info(path)
+    return int(info["size"]), info.get("mtime", info.get("LastModified", info.get("ETag")))
+
+
+@lru_cache(maxsize=None)
+def _read_header(source: str, size: int, mtime: Any) -> RasterHeader:
+    with rasterio.open(vsi_path(source)) as dataset:
+        crs = dataset.crs
+        bounds = dataset.bounds
+        bbox, geometry = footprint(bounds, crs)
+        return RasterHeader(
+            epsg=crs.to_epsg(),
+            wkt2=crs.to_wkt(version="WKT2_2019"),
+            transform=list(dataset.transform)[:9],
+            shape=[dataset.height, dataset.width],
+            bounds=list(bounds),
+            nodata=dataset.nodata,
+            data_type=dataset.dtypes[0],
+            file_size=size,
+            bbox=bbox,
+            geometry=geometry,
+        )
+
+
+def read_header(source: str) -> RasterHeader:
+    """Returns the projection and raster metadata of a GeoTIFF, read from its
+     header only, and its footprint in WGS84.
+
+    Headers are cached by path, size and modification time, so a file is
+     only opened again once it changed. Use `clear_header_cache` to empty the
+     cache.
+
+    Args:
+        source (str): Path or URL of a GeoTIFF, or of a zip archive holding
+         one, see `cog.vsi_path`.
+    """
+    size, mtime = _file_key(source)
+    return _read_header(source, size, mtime)
+
+
+def clear_header_cache() -> None:
+    """Empties the cache of headers read by `read_header`."""
+    _read_header.cache_clear()
@@ -0,0 +1,152 @@
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pystac import Collection, Item
+from pystac.utils import str_to_datetime
+
+from stactools.nalcms.products import iter_products
+
+logger = logging.getLogger(__name__)
+
+DatetimeQuery = Union[str, datetime, Tuple[Optional[datetime], Optional[datetime]], None]
+
+
+class IndexEntry(NamedTuple):
+    id: str
+    region: str
+    gsd: str
+    year: str
+    bbox: List[float]
+    start_datetime: datetime
+    end_datetime: datetime
+
+
+def _timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _parse_datetime(query: DatetimeQuery) -> Tuple[float, float]:
+    """Returns the (start, end) timestamps of a datetime query: a datetime,
+     a (start, end) tuple of datetimes or None, or a STAC API string like
+     "2012-06-01T00:00:00Z" or "2010-01-01T00:00:00Z/..".
+    """
+    if query is None:
+        return -np.inf, np.inf
+    if isinstance(query, datetime):
+        return _timestamp(query), _timestamp(query)
+    if isinstance(query, str):
+        parts = query.split("/")
+        bounds = [None if p in ("", "..") else str_to_datetime(p) for p in parts]
+        query = (bounds[0], bounds[-1])
+    start, end = query
+    return (-np.inf if start is None else _timestamp(start),
+            np.inf if end is None else _timestamp(end))
+
+
+class ProductIndex:
+    """A spatial and temporal index of the NALCMS products.
+
+    Bounding boxes and time ranges are kept in arrays sorted by start time, so
+     a query is a binary search on the start times followed by a vectorized
+     overlap test on the remaining entries.
+
+    No product crosses the antimeridian: a box whose west edge is east of its
+     east edge is a data error (see `products.extent_errors`). It is logged
+     and never matches a bounding box query.
+
+    Use `from_constants` or `from_items` to build it.
+    """
+    def __init__(self, entries: Iterable[IndexEntry]) -> None:
+        self.entries = sorted(entries, key=lambda e: _timestamp(e.start_datetime))
+        bboxes = np.array([e.bbox for e in self.entries], dtype=float).reshape(-1, 4)
+        self._west, self._south, self._east, self._north = bboxes.T
+        self._start = np.array([_timestamp(e.start_datetime) for e in self.entries])
+        self._end = np.array([_timestamp(e.end_datetime) for e in self.entries])
+        self._gsd = np.array([float(e.gsd) for e in self.entries])
+        self._valid_bbox = self._west <= self._east
+        for i in np.flatnonzero(~self._valid_bbox):
+            logger.warning(f"{self.entries[i].id}: bbox {self.entries[i].bbox} has its west edge"
+                           " east of its east edge, it is left out of bbox queries")
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def from_constants(cls) -> "ProductIndex":
+        """Returns the index of every product in `constants.py`.
+
+        Bounding boxes are the STAC `Product.bbox`, the same as the Items'.
+        """
+        entries = []
+        for product in iter_products():
+            years = product.year.split("-")
+            entries.append(
+                IndexEntry(
+                    id=product.id,
+                    region=product.region,
+                    gsd=product.gsd,
+                    year=product.year,
+                    bbox=product.bbox,
+                    start_datetime=str_to_datetime(f"{years[0]}-01-01T00:00:00Z"),
+                    end_datetime=str_to_datetime(f"{years[-1]}-12-31T00:00:00Z"),
+                ))
+        return cls(entries)
+
+    @classmethod
+    def from_items(cls, items: Iterable[Item]) -> "ProductIndex":
+        """Returns the index of STAC Items, e.g. `collection.get_all_items()`,
+         using their `bbox`, `start_datetime`, `end_datetime` and `gsd`.
+        """
+        entries = []
+        for item in items:
+            reg, year, _ = item.id.split("_")
+            entries.append(
+                IndexEntry(
+                    id=item.id,
+                    region=reg,
+                    gsd=str(int(item.properties["gsd"])),
+                    year=year,
+                    bbox=list(item.bbox or []),
+                    start_datetime=str_to_datetime(item.properties["start_datetime"]),
+                    end_datetime=str_to_datetime(item.properties["end_datetime"]),
+                ))
+        return cls(entries)
+
+    @classmethod
+    def from_collection(cls, collection: Collection) -> "ProductIndex":
+        """Returns the index of all the Items below a Collection."""
+        return cls.from_items(collection.get_all_items())
+
+    def find_items(self,
+                   bbox: Optional[Sequence[float]] = None,
+                   datetime: DatetimeQuery = None,
+                   gsd: Optional[Union[str, float]] = None) -> List[IndexEntry]:
+        """Returns the products intersecting a bounding box and time range,
+         in start time order.
+
+        Args:
+            bbox (list): [west, south, east, north] in WGS84, or None for
+             anywhere.
+            datetime: A datetime, a (start, end) tuple (either can be None),
+             a STAC API datetime string ("start/end", ".." for open ends), or
+             None for any time.
+            gsd (str, float): Only products with this GSD [m].
+        """
+        start, end = _parse_datetime(datetime)
+        # Entries starting after the query ends can't match
+        stop = int(np.searchsorted(self._start, end, side="right"))
+
+        mask = self._end[:stop] >= start
+        if gsd is not None:
+            mask &= self._gsd[:stop] == float(gsd)
+        if bbox is not None:
+            west, south, east, north = bbox
+            mask &= self._valid_bbox[:stop]
+            mask &= (self._south[:stop] <= north) & (self._north[:stop] >= south)
+            mask &= (self._west[:stop] <= east) & (self._east[:stop] >= west)
+
+        return [self.entries[i] for i in np.flatnonzero(mask)]
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+from stactools.nalcms.constants import HREF_DIR
+from stactools.nalcms.writer import dumps, read_json, write_bytes
+
+MANIFEST_FILENAME = "nalcms-manifest.json"
+
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    """Returns the manifest stored in a directory, or an empty manifest if
+     there is none.
+
+    Args:
+        directory (str): The directory of the root Collection, a local path
+         or a fsspec URL.
+    """
+    manifest: Optional[Dict[str, Any]] = read_json(os.path.join(directory, MANIFEST_FILENAME))
+    return manifest or {"items": {}}
+
+
+def write_manifest(directory: str, manifest: Dict[str, Any]) -> None:
+    """Writes a manifest to a directory.
+
+    Args:
+        directory (str): The directory of the root Collection.
+        manifest (dict): The manifest, as returned by `read_manifest`.
+    """
+    write_bytes(
+        json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"),
+        os.path.join(directory, MANIFEST_FILENAME))
+
+
+def source_fingerprint(source: str, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Returns the size, modification time and SHA-256 of a source file.
+
+    The file is only hashed if its size or modification time differ from the
+     previous fingerprint.
+
+    Args:
+        source (str): Path to the source COG.
+        previous (dict): The fingerprint of the file from the last run.
+    """
+    stat = os.stat(source)
+    fingerprint: Dict[str, Any] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if previous and all(previous.get(k) == v for k, v in fingerprint.items()):
+        fingerprint["sha256"] = previous["sha256"]
+        return fingerprint
+
+    sha256 = hashlib.sha256()
+    with open(source, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+    fingerprint["sha256"] = sha256.hexdigest()
+    return fingerprint
+
+
+def item_fingerprint(stac_dict: Dict[str, Any],
+                     indent: bool = True,
+                     previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Returns the fingerprint of an Item as it is written: the SHA-256 of
+     its JSON, serialized with the same options, and of its source file, if
+     the data asset is a local COG or archive.
+
+    Args:
+        stac_dict (dict): The Item's `to_dict`, as written by
+         `stac.save_collection`.
+        indent (bool): Whether the JSON is indented, see `writer.dumps`.
+        previous (dict): The manifest entry of the Item from the last run.
+    """
+    sha256 = hashlib.sha256(dumps(stac_dict, indent))
+
+    source = None
+    href = stac_dict["assets"]["data"]["href"]
+    if ".zip/" in href.lower():
+        # A GeoTIFF read in place from its archive, see `cog.vsi_path`
+        href = href[:href.lower().index(".zip/") + len(".zip")]
+    if not href.startswith(HREF_DIR) and os.path.isfile(href):
+        source = source_fingerprint(href, (previous or {}).get("source"))
+        sha256.update(source["sha256"].encode())
+
+    return {"fingerprint": sha256.hexdigest(), "source": source}
@@ -0,0 +1,143 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from pystac.item import Item
+from pystac.utils import str_to_datetime
+from shapely.geometry import shape
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+ROW_GROUP_SIZE = 1000
+GEOPARQUET_VERSION = "1.0.0"
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("Exporting GeoParquet requires pyarrow, install it with"
+                          " `pip install stactools-nalcms[parquet]`")
+
+
+def parquet_schema() -> Any:
+    """Returns the Arrow schema of the exported Items, with the GeoParquet
+     `geo` metadata of its WKB `geometry` column. Every Item footprint is a
+     Polygon, and `bbox` holds the STAC [west, south, east, north] of the
+     Item as longitudes and latitudes.
+    """
+    _require_pyarrow()
+    timestamp = pa.timestamp("us", tz="UTC")
+    geo = {
+        "version": GEOPARQUET_VERSION,
+        "primary_column": "geometry",
+        "columns": {
+            "geometry": {
+                "encoding": "WKB",
+                "geometry_types": ["Polygon"]
+            }
+        },
+    }
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("collection", pa.string()),
+            ("gsd", pa.float64()),
+            ("datetime", timestamp),
+            ("start_datetime", timestamp),
+            ("end_datetime", timestamp),
+            ("proj:epsg", pa.int32()),
+            ("bbox",
+             pa.struct([("xmin", pa.float64()), ("ymin", pa.float64()), ("xmax", pa.float64()),
+                        ("ymax", pa.float64())])),
+            ("assets", pa.map_(pa.string(), pa.string())),
+            ("geometry", pa.binary()),
+            ("stac", pa.large_string()),
+        ],
+        metadata={"geo": json.dumps(geo)},
+    )
+
+
+def _row(item: Item) -> Dict[str, Any]:
+    properties = item.properties
+    start = properties.get("start_datetime")
+    end = properties.get("end_datetime")
+    bbox = item.bbox
+    return {
+        "id": item.id,
+        "collection": item.collection_id,
+        "gsd": properties.get("gsd"),
+        "datetime": item.datetime,
+        "start_datetime": str_to_datetime(start) if start else None,
+        "end_datetime": str_to_datetime(end) if end else None,
+        "proj:epsg": properties.get("proj:epsg"),
+        "bbox": dict(zip(["xmin", "ymin", "xmax", "ymax"], bbox)) if bbox else None,
+        "assets": [(key, asset.href) for key, asset in item.assets.items()],
+        "geometry": shape(item.geometry).wkb if item.geometry else None,
+        "stac": json.dumps(item.to_dict(include_self_link=False), separators=(",", ":")),
+    }
+
+
+def items_to_table(items: Iterable[Item]) -> Any:
+    """Returns a `pyarrow.Table` with one row per Item, see `parquet_schema`."""
+    schema = parquet_schema()
+    rows = [_row(item) for item in items]
+    return pa.Table.from_pydict({name: [row[name] for row in rows]
+                                 for name in schema.names},
+                                schema=schema)
+
+
+def write_parquet(items: Iterable[Item], path: str, row_group_size: int = ROW_GROUP_SIZE) -> int:
+    """Writes Items to a GeoParquet file and returns the number of Items
+     written.
+
+    The Items are consumed and written `row_group_size` at a time, one row
+     group each, so memory use does not grow with the number of Items. Next
+     to the typed columns of `parquet_schema`, the full Item JSON is kept in
+     the `stac` column for `read_parquet`.
+
+    Args:
+        items (iterable): The Items, e.g. `stac.iter_items()` or
+         `collection.get_all_items()`.
+        path (str): The GeoParquet file to write.
+        row_group_size (int): Number of Items per row group.
+    """
+    schema = parquet_schema()
+    count = 0
+    batch: List[Item] = []
+    with pq.ParquetWriter(path, schema) as writer:
+        for item in items:
+            batch.append(item)
+            if len(batch) == row_group_size:
+                writer.write_table(items_to_table(batch))
+                count += len(batch)
+                batch = []
+        if batch or count == 0:
+            writer.write_table(items_to_table(batch))
+            count += len(batch)
+    return count
+
+
+def read_parquet(path: str, filters: Optional[Any] = None) -> Iterator[Item]:
+    """Yields the Items stored in a GeoParquet file by `write_parquet`, one
+     row group at a time.
+
+    Args:
+        path (str): The GeoParquet file.
+        filters: Optional `pyarrow.parquet` filters on the typed columns, e.g.
+         `[("gsd", "=", 30.0)]`.
+    """
+    _require_pyarrow()
+    if filters is not None:
+        table = pq.read_table(path, columns=["stac"], filters=filters)
+        for stac_json in table.column("stac").to_pylist():
+            yield Item.from_dict(json.loads(stac_json))
+        return
+
+    parquet_file = pq.ParquetFile(path)
+    for i in range(parquet_file.num_row_groups):
+        row_group = parquet_file.read_row_group(i, columns=["stac"])
+        for stac_json in row_group.column("stac").to_pylist():
+            yield Item.from_dict(json.loads(stac_json))
@@ -0,0 +1,150 @@
+import itertools as it
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from stactools.nalcms.constants import (
+    DATA_TYPE,
+    FILE_SIZES,
+    GSDS,
+    HREFS_METADATA,
+    HREFS_ZIP,
+    NODATA,
+    PERIODS,
+    PROJECTIONS,
+    REGIONS,
+    SPATIAL_EXTENTS,
+)
+
+
+class Product(NamedTuple):
+    """Everything `constants.py` knows about one NALCMS product."""
+    region: str
+    gsd: str
+    year: str
+    key: str
+    href_zip: str
+    href_metadata: str
+    spatial_extent: List[float]
+    projection: Dict[str, Any]
+    nodata: Optional[float]
+    data_type: str
+    file_size: int
+
+    @property
+    def id(self) -> str:
+        """The ID of the product's STAC Item."""
+        return f"{self.region}_{self.year}_{self.gsd}m"
+
+    @property
+    def bbox(self) -> List[float]:
+        """The STAC [west, south, east, north] bounding box of the product.
+         `SPATIAL_EXTENTS` are stored as [south, west, north, east].
+        """
+        south, west, north, east = self.spatial_extent
+        return [west, south, east, north]
+
+
+# Tables of `constants.py` with an entry for every product, by product key
+PRODUCT_TABLES: Dict[str, Dict[str, Any]] = {
+    "HREFS_ZIP": HREFS_ZIP,
+    "SPATIAL_EXTENTS": SPATIAL_EXTENTS,
+    "PROJECTIONS": PROJECTIONS,
+    "NODATA": NODATA,
+    "DATA_TYPE": DATA_TYPE,
+    "FILE_SIZES": FILE_SIZES,
+}
+
+
+def check_products() -> None:
+    """Raises a ValueError listing every product missing from one of
+     `PRODUCT_TABLES` or from `HREFS_METADATA`, or with an unknown region,
+     GSD or year.
+    """
+    keys = set().union(*PRODUCT_TABLES.values())
+    errors = []
+    for key in sorted(keys):
+        gsd, year, reg = key.split("_")
+        if reg not in REGIONS or gsd[:-1] not in GSDS or not any(
+                year in years for years in PERIODS.values()):
+            errors.append(f"{key}: unknown region, GSD or year")
+        for name, table in PRODUCT_TABLES.items():
+            if key not in table:
+                errors.append(f"{key}: missing from {name}")
+        if f"{gsd}_{year}" not in HREFS_METADATA:
+            errors.append(f"{key}: missing from HREFS_METADATA")
+    if errors:
+        raise ValueError("Inconsistent product constants:\n" + "\n".join(errors))
+
+
+def extent_errors() -> List[str]:
+    """Returns a message for every product whose `SPATIAL_EXTENTS` west edge
+     is east of its east edge.
+
+    None of the products cross the antimeridian, so these extents are data
+     errors (e.g. `30m_2010_ASK`), not boxes wrapping around the globe.
+    """
+    errors = []
+    for product in PRODUCTS.values():
+        west, _, east, _ = product.bbox
+        if west > east:
+            errors.append(f"{product.key}: west {west} is east of east {east} in SPATIAL_EXTENTS")
+    return errors
+
+
+def _build_products() -> Dict[Tuple[str, str, str], Product]:
+    products = {}
+    years = [year for period_years in PERIODS.values() for year in period_years]
+    for reg, gsd, year in it.product(REGIONS.keys(), GSDS, years):
+        key = f"{gsd}m_{year}_{reg}"
+        if key not in HREFS_ZIP:
+            continue
+        products[(reg, gsd, year)] = Product(
+            region=reg,
+            gsd=gsd,
+            year=year,
+            key=key,
+            href_zip=HREFS_ZIP[key],
+            href_metadata=HREFS_METADATA[f"{gsd}m_{year}"],
+            spatial_extent=SPATIAL_EXTENTS[key],
+            projection=PROJECTIONS[key],
+            nodata=NODATA[key],
+            data_type=DATA_TYPE[key],
+            file_size=FILE_SIZES[key],
+        )
+    return products
+
+
+# Every product, by (region, GSD, year), in `it.product(REGIONS, GSDS, years)`
+# order
+PRODUCTS = _build_products()
+
+
+def get_product(region: str, gsd: str, year: str) -> Optional[Product]:
+    """Returns the product for a (region, GSD, year), or None if it does not
+     exist.
+    """
+    return PRODUCTS.get((region, str(gsd), year))
+
+
+def iter_products(period: Optional[str] = None) -> Iterator[Product]:
+    """Yields the products that exist, optionally only those of a period, in
+     `it.product(REGIONS, GSDS, PERIODS[period])` order.
+
+    Args:
+        period (str): "yearly" or "change", or None for every product.
+    """
+    years = None if period is None else PERIODS[period]
+    for product in PRODUCTS.values():
+        if years is None or product.year in years:
+            yield product
+
+
+def archives() -> Dict[str, List[Product]]:
+    """Returns the products by source archive (`href_zip`), in product order.
+
+    Several products share one archive, e.g. `30m_*_ASK` and `30m_*_USA`, or
+     `250m_2005_HI` and `250m_2005_NA`.
+    """
+    result: Dict[str, List[Product]] = {}
+    for product in PRODUCTS.values():
+        result.setdefault(product.href_zip, []).append(product)
+    return result
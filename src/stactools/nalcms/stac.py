@@ -1,8 +1,12 @@
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from functools import lru_cache
 from shapely.geometry import box
 import itertools as it
-from typing import Any, List, Union
+import re
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Union
 
 from pystac import (Collection, Asset, Extent, SpatialExtent, TemporalExtent, CatalogType,
                     MediaType)
@@ -14,7 +18,10 @@ from pystac.extensions.file import FileExtension
 from pystac.extensions.item_assets import AssetDefinition, ItemAssetsExtension
 from pystac.extensions.label import (
     LabelClasses,
+    LabelCount,
     LabelExtension,
+    LabelOverview,
+    LabelStatistics,
     LabelTask,
     LabelType,
 )
@@ -25,14 +32,9 @@ from pystac.utils import str_to_datetime
 from stactools.nalcms.constants import (
     CITATION,
     COLLECTION_ID,
-    DATA_TYPE,
     DOI,
-    FILE_SIZES,
-    NODATA,
     PERIODS,
-    SPATIAL_EXTENTS,
     GSDS,
-    HREFS_ZIP,
     HREF_DIR,
     KEYWORDS,
     PROJECTIONS,
@@ -50,6 +52,13 @@ from stactools.nalcms.constants import (
     HREFS_METADATA,
     VALUES,
 )
+from stactools.nalcms.cog import cog_path, is_zip, zip_members
+from stactools.nalcms.header import read_header
+from stactools.nalcms.stats import ClassStats
+from stactools.nalcms.manifest import item_fingerprint, read_manifest, write_manifest
+from stactools.nalcms.products import Product, get_product, iter_products
+from stactools.nalcms.timing import stage, timed
+from stactools.nalcms.writer import dumps, exists, read_bytes, write_objects
 
 logger = logging.getLogger(__name__)
 
@@ -72,7 +81,7 @@ def create_nalcms_collection() -> Collection:
     Returns:
         Collection: STAC Collection object
     """
-    spatial_extents = list(SPATIAL_EXTENTS.values())
+    spatial_extents = [product.bbox for product in iter_products()]
     extent = Extent(
         SpatialExtent([bounding_extent(spatial_extents)]),
         TemporalExtent(TEMPORAL_EXTENT),
@@ -136,7 +145,7 @@ def create_period_collection(period: str) -> Collection:
         period (str): "yearly" or "change".
     """
     years = PERIODS[period]
-    extents = [v for k, v in SPATIAL_EXTENTS.items() if k.split("_")[1] in years]
+    extents = [product.bbox for product in iter_products(period)]
     extent = Extent(
         SpatialExtent([bounding_extent(extents)]),
         TemporalExtent(TEMPORAL_EXTENT),
@@ -192,7 +201,7 @@ def create_period_collection(period: str) -> Collection:
                 roles=["metadata"],
                 title="NALCMS metadata",
             )),
-        "landcover":
+        "data":
         AssetDefinition({
             "type":
             "application/zip",
@@ -222,31 +231,98 @@ def create_period_collection(period: str) -> Collection:
     return collection
 
 
-def create_item(reg: str, gsd: str, year: str, source: str) -> Union[Item, None]:
+@lru_cache(maxsize=None)
+def _item_template(gsd: str, year: str, reg: str) -> Optional[Dict[str, Any]]:
+    """Returns the static parts of the STAC Item for a given (GSD, year,
+     region), or None if that combination does not exist in the dataset.
+
+    The result is cached, it must not be modified. Use
+     `clear_item_templates` to empty the cache.
+    """
+    product = get_product(reg, gsd, year)
+
+    if product is None:
+        return None
+
+    # bbox and geometry
+    bbox = product.bbox
+    polygon = box(*bbox, ccw=True)
+    coordinates = [list(i) for i in list(polygon.exterior.coords)]
+
+    years = year.split("-")
+    diff = "change " if "-" in year else ""
+    vals = values_change if "-" in year else values
+
+    return {
+        "product": product,
+        "bbox": bbox,
+        "coordinates": coordinates,
+        "years": years,
+        "diff": diff,
+        "datetime": str_to_datetime(f"{years[0]}, 1, 1"),
+        "metadata_href": os.path.join(HREF_DIR, product.href_metadata),
+        "data_href": os.path.join(HREF_DIR, product.href_zip),
+        "raster_band": {
+            "nodata": product.nodata,
+            "sampling": "area",
+            "data_type": product.data_type,
+            "spatial_resolution": float(gsd),
+        },
+        "values": vals,
+        "classes": [v for d in vals for v in d["values"]],
+    }
+
+
+def clear_item_templates() -> None:
+    """Empties the cache of static Item data used by `create_item`."""
+    _item_template.cache_clear()
+
+
+@timed("create_item", lambda reg, gsd, year, *args, **kwargs: {"item": f"{reg}_{year}_{gsd}m"})
+def create_item(reg: str,
+                gsd: str,
+                year: str,
+                source: str,
+                compact: bool = False,
+                from_header: bool = False) -> Union[Item, None]:
     """Returns a STAC Item for a given (region, GSD, year) if that combination
      exists in the dataset, else None.
 
+    The parts of the Item that only depend on (region, GSD, year) are
+     computed once and cached, see `clear_item_templates`.
+
     Args:
         reg (str): The Region.
         gsd (str): The GSD [m].
         year (str): The year or difference in years (e.g. "2010-2015").
-        source (str): The path to the corresponding COG to be included as an
-         asset.
+        source (str): The path to the corresponding COG, or CEC zip archive,
+         to be included as an asset.
+        compact (bool): Leave the class table (`file:values` and
+         `label:classes`) out of the Item. It is still described by the
+         period Collection's summaries and `item_assets`.
+        from_header (bool): Read the projection, footprint, nodata, data type
+         and file size from the source's header instead of the constants, see
+         `header.read_header`.
     """
-    constants_key = f"{gsd}m_{year}_{reg}"
+    template = _item_template(str(gsd), year, reg)
 
-    if constants_key not in HREFS_ZIP.keys():
+    if template is None:
         return None
 
+    product = template["product"]
+    years = template["years"]
+    diff = template["diff"]
+    header = read_header(source) if from_header and source else None
+
     # bbox and geometry
-    bbox = SPATIAL_EXTENTS[constants_key]
-    polygon = box(*bbox, ccw=True)
-    coordinates = [list(i) for i in list(polygon.exterior.coords)]
-    geometry = {"type": "Polygon", "coordinates": [coordinates]}
+    if header:
+        bbox = list(header.bbox)
+        geometry = deepcopy(header.geometry)
+    else:
+        bbox = template["bbox"]
+        geometry = {"type": "Polygon", "coordinates": [deepcopy(template["coordinates"])]}
 
     # Item properties
-    years = year.split("-")
-    diff = "change " if "-" in year else ""
     properties = {
         "title": f"{reg} land cover {diff}({year}, {gsd} m)",
         "description": f"Land cover {diff}for {year} over {REGIONS[reg]} ({gsd} m)",
@@ -260,16 +336,15 @@ def create_item(reg: str, gsd: str, year: str, source: str) -> Union[Item, None]
         id=f"{reg}_{year}_{gsd}m",
         geometry=geometry,
         bbox=bbox,
-        datetime=str_to_datetime(f"{years[0]}, 1, 1"),
+        datetime=template["datetime"],
         properties=properties,
     )
 
     # Create metadata asset
-    metadata_href = os.path.join(HREF_DIR, HREFS_METADATA[f"{gsd}m_{year}"])
     item.add_asset(
         "metadata",
         Asset(
-            href=metadata_href,
+            href=template["metadata_href"],
             media_type="application/vnd.ms-word.document",
             roles=["metadata"],
             title=f"Metadata for land cover {diff}for {year} ({gsd} m)",
@@ -280,10 +355,10 @@ def create_item(reg: str, gsd: str, year: str, source: str) -> Union[Item, None]
     if source:
         data_href = source
     else:
-        data_href = os.path.join(HREF_DIR, HREFS_ZIP[f"{gsd}m_{year}_{reg}"])
+        data_href = template["data_href"]
     data_asset = Asset(
         href=data_href,
-        media_type="application/zip" if not source else MediaType.COG,
+        media_type="application/zip" if not source or is_zip(source) else MediaType.COG,
         roles=["data"],
         title=(f"Data for land cover {diff}over "
                f"{REGIONS[reg]} for {year} ({gsd} m)"),
@@ -292,45 +367,279 @@ def create_item(reg: str, gsd: str, year: str, source: str) -> Union[Item, None]
 
     # Include projection information
     proj_ext = ProjectionExtension.ext(item, add_if_missing=True)
-    proj_ext.epsg = PROJECTIONS[constants_key]["epsg"]
-    proj_ext.transform = PROJECTIONS[constants_key]["transform"]
-    proj_ext.bbox = PROJECTIONS[constants_key]["bounds"]
-    proj_ext.wkt2 = PROJECTIONS[constants_key]["wkt"]
-    proj_ext.shape = PROJECTIONS[constants_key]["shape"]
+    if header:
+        proj_ext.epsg = header.epsg
+        proj_ext.transform = list(header.transform)
+        proj_ext.bbox = list(header.bounds)
+        proj_ext.wkt2 = header.wkt2
+        proj_ext.shape = list(header.shape)
+    else:
+        proj_ext.epsg = product.projection["epsg"]
+        proj_ext.transform = product.projection["transform"]
+        proj_ext.bbox = product.projection["bounds"]
+        proj_ext.wkt2 = product.projection["wkt"]
+        proj_ext.shape = product.projection["shape"]
 
     # Include raster information
-    sampling: Any = ["area"]
-    rast_band = RasterBand.create(nodata=NODATA[constants_key],
-                                  sampling=sampling[0],
-                                  data_type=DATA_TYPE[constants_key],
-                                  spatial_resolution=float(gsd))
+    raster_band = template["raster_band"]
+    if header:
+        raster_band = dict(raster_band, nodata=header.nodata, data_type=header.data_type)
+    rast_band = RasterBand.create(**raster_band)
     rast_ext = RasterExtension.ext(data_asset, add_if_missing=True)
     rast_ext.bands = [rast_band]
 
     # Include file information
-    vals = values_change if "-" in year else values
     file_ext = FileExtension.ext(data_asset, add_if_missing=True)
-    file_ext.size = FILE_SIZES[constants_key]
-    file_ext.values = vals
+    file_ext.size = header.file_size if header else product.file_size
+    if not compact:
+        file_ext.values = template["values"]
 
     # Include label information
-    classes: List[Any] = sum([d["values"] for d in vals], [])
     label_ext = LabelExtension.ext(item, add_if_missing=True)
     label_ext.label_type = LabelType.RASTER
     label_ext.label_tasks = [LabelTask.CLASSIFICATION]
     label_ext.label_properties = None
     label_ext.label_description = ""
-    label_ext.label_classes = [
-        # TODO: The STAC Label extension JSON Schema is incorrect.
-        # https://github.com/stac-extensions/label/pull/8
-        # https://github.com/stac-utils/pystac/issues/611
-        # When it is fixed, this should be None, not the empty string.
-        LabelClasses.create(classes, "")
-    ]
+    if not compact:
+        label_ext.label_classes = [
+            # TODO: The STAC Label extension JSON Schema is incorrect.
+            # https://github.com/stac-extensions/label/pull/8
+            # https://github.com/stac-utils/pystac/issues/611
+            # When it is fixed, this should be None, not the empty string.
+            LabelClasses.create(list(template["classes"]), "")
+        ]
 
     return item
 
 
+def add_class_stats(item: Item, stats: ClassStats) -> None:
+    """Adds the pixel count, and area in m² if known, of each land cover
+     class to an Item's `label:overviews`.
+
+    Only the classes of the Item's product are included (see `VALUES`),
+     classes without any pixel are left out.
+
+    Args:
+        item (Item): An Item created by `create_item`.
+        stats (ClassStats): The class counts of the Item's data, see
+         `stats.class_stats`.
+    """
+    reg, year, gsd = item.id.split("_")
+    template = _item_template(gsd[:-1], year, reg)
+    if template is None:
+        raise ValueError(f"{item.id} is not a NALCMS Item")
+
+    codes = [code for code in template["classes"] if stats.counts.get(code)]
+    statistics = None
+    if stats.pixel_area is not None:
+        statistics = [
+            LabelStatistics.create(f"{code} area (m2)", stats.counts[code] * stats.pixel_area)
+            for code in codes
+        ]
+
+    label_ext = LabelExtension.ext(item)
+    label_ext.label_overviews = [
+        LabelOverview.create(
+            None,
+            counts=[LabelCount.create(str(code), stats.counts[code]) for code in codes],
+            statistics=statistics,
+        )
+    ]
+
+
+def find_source(product: Product, source_dir: Optional[str]) -> str:
+    """Returns the local source of a product in `source_dir`, or "" if there
+     is none.
+
+    The product's archive (e.g. `canada_2010.zip`, as saved by
+     `download.download_archives`) must be in `source_dir`. The COG made from
+     it by `cog.create_cog`, named after the GeoTIFF inside it (see
+     `cog.cog_path`), is preferred to the archive itself. For an archive
+     shared by several products, the GeoTIFF of the product is the one with
+     the region code in its name, e.g. `..._HI.tif`.
+    """
+    if not source_dir:
+        return ""
+    archive = os.path.join(source_dir, os.path.basename(product.href_zip))
+    if not os.path.isfile(archive):
+        return ""
+
+    source = archive
+    members = zip_members(archive)
+    if len(members) > 1:
+        members = [
+            member for member in members
+            if product.region in re.split(r"[^A-Za-z0-9]", os.path.basename(member).upper())
+        ]
+        if len(members) != 1:
+            logger.warning(f"No single GeoTIFF for {product.id} in {archive}")
+            return ""
+        source = f"{archive}/{members[0]}"
+
+    path = cog_path(source, source_dir)
+    return path if os.path.isfile(path) else source
+
+
+def create_period_items(period: str,
+                        workers: int = 1,
+                        compact: bool = False,
+                        source_dir: Optional[str] = None) -> List[Item]:
+    """Returns the STAC Items of a period for every (region, GSD, year)
+     combination that exists in the dataset.
+
+    Items are always returned in `products.iter_products` order, so the
+     result is the same whether or not they are built in parallel.
+
+    Args:
+        period (str): "yearly" or "change".
+        workers (int): Number of threads used to build the Items.
+        compact (bool): Leave the class table out of the Items.
+        source_dir (str): Local directory of COGs or archives used as the
+         data assets of the Items that have one, see `find_source`.
+    """
+    period_products = list(iter_products(period))
+
+    def create(product: Product) -> Optional[Item]:
+        return create_item(product.region, product.gsd, product.year,
+                           find_source(product, source_dir), compact)
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            items = list(executor.map(create, period_products))
+    else:
+        items = [create(product) for product in period_products]
+
+    return [item for item in items if item is not None]
+
+
+def iter_items(periods: Optional[List[str]] = None, compact: bool = False) -> Iterator[Item]:
+    """Yields the STAC Items for every (region, GSD, year) combination that
+     exists in the dataset, one at a time and without parent Collections.
+
+    Items are yielded period by period, in the same order as
+     `create_period_items`.
+
+    Args:
+        periods (list): Only yield Items of these periods, "yearly" and/or
+         "change". Defaults to all periods.
+        compact (bool): Leave the class table out of the Items.
+    """
+    for per in periods or PERIODS.keys():
+        for product in iter_products(per):
+            item = create_item(product.region, product.gsd, product.year, "", compact)
+            if item is not None:
+                yield item
+
+
+def write_ndjson(items: Iterator[Item], stream: TextIO) -> int:
+    """Writes Items to a stream as newline delimited JSON, one Item per line,
+     and returns the number of Items written.
+
+    The Items are written without links, ready for bulk loading into a STAC
+     API.
+
+    Args:
+        items (iterator): The Items to write.
+        stream (TextIO): A text stream, e.g. an open file or `sys.stdout`.
+    """
+    count = 0
+    for item in items:
+        stream.write(dumps(item.to_dict(include_self_link=False), indent=False).decode("utf-8"))
+        stream.write("\n")
+        count += 1
+    return count
+
+
+def create_full_collection(workers: int = 1,
+                           compact: bool = False,
+                           source_dir: Optional[str] = None) -> Collection:
+    """Returns the root NALCMS Collection with one child Collection per period
+     and all of their Items.
+
+    Args:
+        workers (int): Number of threads used to build the Items.
+        compact (bool): Leave the class table out of the Items.
+        source_dir (str): Local directory of COGs or archives used as data
+         assets, see `find_source`.
+    """
+    root_col = create_nalcms_collection()
+
+    for per in PERIODS.keys():
+        period = create_period_collection(per)
+        root_col.add_child(period)
+        with stage("create_period_items", period=per):
+            items = create_period_items(per, workers, compact, source_dir)
+        period.add_items(items)
+
+    return root_col
+
+
+def save_collection(collection: Collection,
+                    workers: int = 1,
+                    incremental: bool = False,
+                    indent: bool = True) -> None:
+    """Saves a Collection and everything below it to their self HREFs.
+
+    The files are the ones `collection.save()` writes, serialized with
+     `writer.dumps` and written by `workers` threads through fsspec, so the
+     HREFs can be local paths or URLs such as `s3://bucket/nalcms`.
+
+    With `incremental`, a manifest of the fingerprint of each Item, its JSON
+     and source file, is kept next to the root Collection (see
+     `manifest.MANIFEST_FILENAME`). Only Items whose fingerprint changed since
+     the last run, and Collections whose JSON changed, are written; other
+     files are left untouched.
+
+    Args:
+        collection (Collection): A Collection with normalized HREFs.
+        workers (int): Number of threads used to write the files.
+        incremental (bool): Only write the files that changed.
+        indent (bool): Indent the JSON with 2 spaces, or write compact JSON.
+    """
+    root = collection.get_root() or collection
+    catalog_type = root.catalog_type
+    items_include_self_link = catalog_type == CatalogType.ABSOLUTE_PUBLISHED
+
+    items = [(item.to_dict(include_self_link=items_include_self_link), item.self_href)
+             for item in collection.get_all_items()]
+    if incremental:
+        directory = os.path.dirname(root.self_href)
+        previous = read_manifest(directory)["items"]
+        entries = {
+            stac_dict["id"]: item_fingerprint(stac_dict, indent, previous.get(stac_dict["id"]))
+            for stac_dict, _ in items
+        }
+        items = [(stac_dict, href) for stac_dict, href in items
+                 if previous.get(stac_dict["id"], {}).get("fingerprint") !=
+                 entries[stac_dict["id"]]["fingerprint"] or not exists(href)]
+        logger.info(f"Writing {len(items)} of {len(entries)} Items")
+
+    with stage("write_items", count=len(items)):
+        write_objects(items, workers, indent)
+
+    # Same self link rules as `Catalog.save`
+    catalogs = []
+    for catalog, _, _ in collection.walk():
+        include_self_link = (catalog_type == CatalogType.ABSOLUTE_PUBLISHED
+                             or (catalog_type != CatalogType.SELF_CONTAINED and catalog is root))
+        stac_dict = catalog.to_dict(include_self_link=include_self_link)
+        if incremental and _is_saved(stac_dict, catalog.self_href, indent):
+            continue
+        catalogs.append((stac_dict, catalog.self_href))
+    with stage("write_collections", count=len(catalogs)):
+        write_objects(catalogs, workers, indent)
+
+    if incremental:
+        write_manifest(directory, {"items": entries})
+
+
+def _is_saved(stac_dict: Dict[str, Any], href: str, indent: bool = True) -> bool:
+    """Returns True if the file at `href` already holds `stac_dict`, written
+     with the same options.
+    """
+    return read_bytes(href) == dumps(stac_dict, indent)
+
+
 def bounding_extent(extents: List[Any]) -> List[Any]:
     """Find the outer extent of a list of extents
     """
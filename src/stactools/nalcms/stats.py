@@ -0,0 +1,163 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+from stactools.nalcms.change import encode_change
+from stactools.nalcms.cog import vsi_path
+from stactools.nalcms.constants import VALUES
+
+# Largest land cover code, "Snow and ice" to "Snow and ice" in change products
+MAX_CODE = 1919
+
+CLASSES = sorted(VALUES.keys())
+
+# Maps blocks read from each raster, and their nodata values, to the indices
+# to count, all in [0, size)
+BlockCodes = Callable[[List[np.ndarray], List[Optional[float]]], np.ndarray]
+
+
+class ClassStats(NamedTuple):
+    """Pixel count per land cover code, and the area of a pixel in m² if the
+     raster is projected.
+    """
+    counts: Dict[int, int]
+    pixel_area: Optional[float]
+
+
+class TransitionMatrix(NamedTuple):
+    """Pixel count of each transition between land cover classes, with rows
+     for the class before and columns for the class after, in `CLASSES`
+     order, and the area of a pixel in m² if the rasters are projected.
+    """
+    counts: np.ndarray
+    pixel_area: Optional[float]
+
+    def to_class_stats(self) -> ClassStats:
+        """Returns the counts by change code, as in `values_change`."""
+        return ClassStats(
+            {
+                before * 100 + after: int(self.counts[i, j])
+                for i, before in enumerate(CLASSES) for j, after in enumerate(CLASSES)
+                if self.counts[i, j]
+            }, self.pixel_area)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the matrix as a JSON serializable dict."""
+        return {
+            "classes": CLASSES,
+            "names": [VALUES[code] for code in CLASSES],
+            "counts": self.counts.tolist(),
+            "area_m2":
+            None if self.pixel_area is None else (self.counts * self.pixel_area).tolist(),
+        }
+
+
+def _block_histogram(paths: List[str], windows: List[Window], block_codes: BlockCodes,
+                     size: int) -> np.ndarray:
+    """Returns the histogram of the indices returned by `block_codes` for the
+     blocks of some windows of the rasters.
+    """
+    histogram = np.zeros(size, dtype=np.int64)
+    with ExitStack() as stack:
+        datasets = [stack.enter_context(rasterio.open(path)) for path in paths]
+        nodatas = [dataset.nodata for dataset in datasets]
+        for window in windows:
+            blocks = [dataset.read(1, window=window) for dataset in datasets]
+            histogram += np.bincount(block_codes(blocks, nodatas), minlength=size)
+    return histogram
+
+
+def _histogram(sources: List[str], block_codes: BlockCodes, size: int,
+               workers: int) -> Tuple[np.ndarray, Optional[float]]:
+    """Returns the histogram of `block_codes` over rasters on the same grid,
+     and the area of a pixel in m² if they are projected.
+
+    The rasters are read block by block. The blocks are split between
+     `workers` threads, each with its own dataset handles and running
+     histogram, so memory use only depends on the block size and the number
+     of workers, not on the raster size.
+    """
+    paths = [vsi_path(source) for source in sources]
+    with rasterio.open(paths[0]) as dataset:
+        windows = [window for _, window in dataset.block_windows(1)]
+        transform = dataset.transform
+        projected = dataset.crs is not None and dataset.crs.is_projected
+
+    chunks = [windows[i::workers] for i in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        histogram = sum(
+            executor.map(lambda chunk: _block_histogram(paths, chunk, block_codes, size), chunks),
+            np.zeros(size, dtype=np.int64))
+
+    return histogram, abs(transform.determinant) if projected else None
+
+
+def _class_codes(blocks: List[np.ndarray], nodatas: List[Optional[float]]) -> np.ndarray:
+    block = blocks[0].ravel()
+    if nodatas[0] is not None:
+        block = block[block != nodatas[0]]
+    return block[(block >= 0) & (block <= MAX_CODE)].astype(np.int64)
+
+
+def class_stats(source: str, workers: int = 1) -> ClassStats:
+    """Counts the pixels of each land cover code in a raster, reading it
+     block by block with `workers` threads. Nodata and negative values are
+     left out.
+
+    Args:
+        source (str): Path or URL of a GeoTIFF, or of a zip archive holding
+         one, see `cog.vsi_path`.
+        workers (int): Number of threads reading blocks.
+    """
+    histogram, pixel_area = _histogram([source], _class_codes, MAX_CODE + 1, workers)
+    counts = {int(code): int(histogram[code]) for code in np.flatnonzero(histogram)}
+    return ClassStats(counts, pixel_area)
+
+
+def _transition_indices(codes: np.ndarray) -> np.ndarray:
+    """Returns the flat transition matrix index of valid change codes."""
+    codes = codes.ravel().astype(np.int64)
+    before, after = codes // 100, codes % 100
+    valid = (before >= 1) & (before <= len(CLASSES)) & (after >= 1) & (after <= len(CLASSES))
+    indices: np.ndarray = (before[valid] - 1) * len(CLASSES) + after[valid] - 1
+    return indices
+
+
+def _change_codes(blocks: List[np.ndarray], nodatas: List[Optional[float]]) -> np.ndarray:
+    block = blocks[0]
+    if nodatas[0] is not None:
+        block = block[block != nodatas[0]]
+    return _transition_indices(block)
+
+
+def _yearly_codes(blocks: List[np.ndarray], nodatas: List[Optional[float]]) -> np.ndarray:
+    return _transition_indices(encode_change(blocks[0], blocks[1], nodatas[0], nodatas[1]))
+
+
+def transition_matrix(change: Optional[str] = None,
+                      before: Optional[str] = None,
+                      after: Optional[str] = None,
+                      workers: int = 1) -> TransitionMatrix:
+    """Computes the land cover transition matrix from a change raster, or
+     from two yearly rasters on the same grid, reading them block by block
+     with `workers` threads.
+
+    Args:
+        change (str): A change raster, with the codes of `values_change`.
+        before (str): The earlier yearly raster, if `change` is not given.
+        after (str): The later yearly raster, if `change` is not given.
+        workers (int): Number of threads reading blocks.
+    """
+    size = len(CLASSES)**2
+    if change is not None:
+        histogram, pixel_area = _histogram([change], _change_codes, size, workers)
+    elif before is not None and after is not None:
+        histogram, pixel_area = _histogram([before, after], _yearly_codes, size, workers)
+    else:
+        raise ValueError("Either a change raster, or the before and after rasters, are needed")
+
+    return TransitionMatrix(histogram.reshape(len(CLASSES), len(CLASSES)), pixel_area)
@@ -0,0 +1,75 @@
+from typing import List, Optional, Sequence
+
+import rasterio
+from rasterio.crs import CRS
+from rasterio.transform import Affine
+from rasterio.windows import Window
+
+from stactools.nalcms import cog
+from stactools.nalcms.products import get_product
+
+# Regions whose products lie inside the North America mosaic of the same
+# GSD and year, on the same grid
+SUBSET_REGIONS = ["CAN", "USA", "MEX", "ASK"]
+
+
+def subset_window(transform: Affine, width: int, height: int, bounds: Sequence[float]) -> Window:
+    """Returns the window of a raster covering projected `bounds`
+     [left, bottom, right, top].
+
+    Raises a ValueError if the bounds are not on the raster's pixel grid or
+     not inside the raster.
+    """
+    left, bottom, right, top = bounds
+    offsets = [(left - transform.c) / transform.a, (top - transform.f) / transform.e,
+               (right - left) / transform.a, (bottom - top) / transform.e]
+    rounded = [int(round(offset)) for offset in offsets]
+    if any(abs(offset - r) > 1e-6 for offset, r in zip(offsets, rounded)):
+        raise ValueError(f"Bounds {list(bounds)} are not on the pixel grid of the source")
+
+    col_off, row_off, w, h = rounded
+    if col_off < 0 or row_off < 0 or col_off + w > width or row_off + h > height:
+        raise ValueError(f"Bounds {list(bounds)} are not inside the source")
+    return Window(col_off, row_off, w, h)
+
+
+def create_subset_cog(source: str,
+                      region: str,
+                      gsd: str,
+                      year: str,
+                      destination: str,
+                      args: Optional[List[str]] = None) -> str:
+    """Cuts a region's COG out of the North America mosaic of the same GSD
+     and year and returns its path, ready to be used as the `source` of
+     `stac.create_item`.
+
+    The bounds of the region are the projected `PROJECTIONS[...]["bounds"]`
+     of its product, which are on the mosaic's grid. The window is cut by
+     gdal_translate's `-srcwin` in the same pass that writes the COG, so the
+     pixels are decoded and compressed once, without an intermediate file.
+
+    Args:
+        source (str): The North America raster, or its zip archive, see
+         `cog.vsi_path`.
+        region (str): One of `SUBSET_REGIONS`.
+        gsd (str): The GSD of the product.
+        year (str): The year or range of years of the product.
+        destination (str): Local directory to save the COG.
+        args (list): gdal_translate creation options, see `cog.cog_args`.
+    """
+    product = get_product(region, gsd, year)
+    if region not in SUBSET_REGIONS or product is None:
+        raise ValueError(f"No {region} product for {gsd}m {year} inside the NA mosaic")
+
+    with rasterio.open(cog.vsi_path(source)) as src:
+        if src.crs != CRS.from_wkt(product.projection["wkt"]):
+            raise ValueError(f'"{source}" is not in the CRS of {product.id}')
+        window = subset_window(src.transform, src.width, src.height,
+                               product.projection["bounds"])
+
+    srcwin = [window.col_off, window.row_off, window.width, window.height]
+    return cog.create_cog(source,
+                          destination,
+                          args,
+                          output_name=f"{product.id}_cog.tif",
+                          extra_args=["-srcwin"] + [str(int(value)) for value in srcwin])
@@ -0,0 +1,355 @@
+import json
+import math
+import queue
+import re
+import threading
+import warnings
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.errors import NotGeoreferencedWarning
+from rasterio.io import MemoryFile
+from rasterio.transform import from_bounds
+from rasterio.warp import reproject, transform_bounds
+
+from stactools.nalcms import cog
+from stactools.nalcms.stats import MAX_CODE
+
+TILE_SIZE = 256
+WEB_MERCATOR = "EPSG:3857"
+# Half the width of the web mercator world, in meters
+ORIGIN = 20037508.342789244
+CACHE_BYTES = 64 * 1024 * 1024
+POOL_SIZE = 4
+
+# RGB of each land cover class, from the NALCMS legend
+COLORS = {
+    1: (0x03, 0x3e, 0x00),
+    2: (0x93, 0x9b, 0x71),
+    3: (0x19, 0x6d, 0x12),
+    4: (0x1f, 0xab, 0x01),
+    5: (0x5b, 0x72, 0x5c),
+    6: (0x6b, 0x7d, 0x2c),
+    7: (0xb2, 0x9d, 0x29),
+    8: (0xb4, 0x88, 0x33),
+    9: (0xe9, 0xda, 0x5d),
+    10: (0xe0, 0xcd, 0x88),
+    11: (0xa0, 0x74, 0x51),
+    12: (0xba, 0xd2, 0x92),
+    13: (0x3f, 0x89, 0x70),
+    14: (0x6c, 0xa2, 0x89),
+    15: (0xe6, 0xad, 0x6a),
+    16: (0xa9, 0xab, 0xae),
+    17: (0xdb, 0x21, 0x26),
+    18: (0x4c, 0x73, 0xa1),
+    19: (0xff, 0xf7, 0xfe),
+}
+# RGBA of the change codes that are not a change (e.g. 1515)
+UNCHANGED_COLOR = (0xd0, 0xd0, 0xd0, 0x60)
+
+
+def class_palette() -> np.ndarray:
+    """Returns the (MAX_CODE + 1, 4) RGBA lookup table of the land cover
+     classes. Other values are transparent.
+    """
+    palette = np.zeros((MAX_CODE + 1, 4), dtype=np.uint8)
+    for code, rgb in COLORS.items():
+        palette[code] = rgb + (255, )
+    return palette
+
+
+def change_palette() -> np.ndarray:
+    """Returns the (MAX_CODE + 1, 4) RGBA lookup table of the change codes
+     `before * 100 + after`: the color of the `after` class for a change,
+     and a translucent grey for no change. Other values are transparent.
+    """
+    palette = np.zeros((MAX_CODE + 1, 4), dtype=np.uint8)
+    for before in COLORS.keys():
+        for after, rgb in COLORS.items():
+            palette[before * 100 + after] = UNCHANGED_COLOR if before == after else rgb + (255, )
+    return palette
+
+
+PALETTES = {"classes": class_palette, "change": change_palette}
+
+
+def colorize(data: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    """Returns the (4, height, width) RGBA image of class or change codes."""
+    valid = (data >= 0) & (data < len(palette))
+    rgba = palette[np.where(valid, data, 0)]
+    rgba[~valid] = 0
+    return np.moveaxis(rgba, -1, 0)
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """Returns a (4, height, width) uint8 RGBA image as PNG."""
+    _, height, width = rgba.shape
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", NotGeoreferencedWarning)
+        with MemoryFile() as memfile:
+            with memfile.open(driver="PNG", width=width, height=height, count=4,
+                              dtype="uint8") as dst:
+                dst.write(rgba)
+            return bytes(memfile.read())
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Returns the web mercator bounds (left, bottom, right, top) of an XYZ
+     tile.
+    """
+    size = 2 * ORIGIN / 2**z
+    left = -ORIGIN + x * size
+    top = ORIGIN - y * size
+    return left, top - size, left + size, top
+
+
+def tile_resolution(z: int, y: int, tile_size: int = TILE_SIZE) -> float:
+    """Returns the ground resolution, in meters per pixel, at the center of
+     a row of XYZ tiles. Web mercator meters shrink by the cosine of the
+     latitude.
+    """
+    latitude = math.atan(math.sinh(math.pi * (1 - 2 * (y + 0.5) / 2**z)))
+    return 2 * ORIGIN / 2.0**z / tile_size * math.cos(latitude)
+
+
+class TileCache:
+    """A thread-safe LRU cache of encoded tiles, bounded by their total size
+     in bytes, that counts hits and misses.
+
+    Args:
+        max_bytes (int): Maximum total size of the cached tiles.
+    """
+    def __init__(self, max_bytes: int = CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._tiles: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is None:
+                self.misses += 1
+                return None
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            return tile
+
+    def put(self, key: Hashable, tile: bytes) -> None:
+        with self._lock:
+            if len(tile) > self.max_bytes:
+                return
+            if key in self._tiles:
+                self.bytes -= len(self._tiles.pop(key))
+            self._tiles[key] = tile
+            self.bytes += len(tile)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._tiles.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "tiles": len(self._tiles),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class DatasetPool:
+    """A bounded pool of open rasterio datasets, shared by any number of
+     threads. A dataset is used by one thread at a time; at most `size` are
+     opened, and once they all are, threads wait for one to be released.
+
+    Args:
+        open_dataset (callable): Opens a new dataset.
+        size (int): Maximum number of open datasets.
+    """
+    def __init__(self, open_dataset: Callable[[], Any], size: int = POOL_SIZE) -> None:
+        self._open_dataset = open_dataset
+        self.size = size
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._datasets: List[Any] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Returns the number of open datasets."""
+        return len(self._datasets)
+
+    @contextmanager
+    def dataset(self) -> Iterator[Any]:
+        """Lends an open dataset for the duration of a `with` block."""
+        try:
+            dataset = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                dataset = None
+                if len(self._datasets) < self.size:
+                    dataset = self._open_dataset()
+                    self._datasets.append(dataset)
+            if dataset is None:
+                dataset = self._idle.get()
+        try:
+            yield dataset
+        finally:
+            self._idle.put(dataset)
+
+    def close(self) -> None:
+        """Closes every dataset. Datasets lent at the time must not be used
+         afterwards.
+        """
+        with self._lock:
+            for dataset in self._datasets:
+                dataset.close()
+            self._datasets = []
+            self._idle = queue.LifoQueue()
+
+
+class TileRenderer:
+    """Renders web mercator XYZ PNG tiles of a class or change COG.
+
+    The COG and each of its overviews are kept open in a `DatasetPool` of at
+     most `pool_size` datasets each, shared by all threads, so the number of
+     open files does not grow with the number of requests or threads.
+     Encoded tiles are kept in a `TileCache`.
+
+    Args:
+        source (str): The COG, see `cog.vsi_path`.
+        palette (str): "classes" for land cover, or "change" for change codes.
+        cache_bytes (int): Maximum total size of the cached tiles.
+        tile_size (int): Width and height of the tiles in pixels.
+        pool_size (int): Maximum number of open datasets per overview level.
+    """
+    def __init__(self,
+                 source: str,
+                 palette: str = "classes",
+                 cache_bytes: int = CACHE_BYTES,
+                 tile_size: int = TILE_SIZE,
+                 pool_size: int = POOL_SIZE) -> None:
+        self.path = cog.vsi_path(source)
+        self.palette_name = palette
+        self.palette = PALETTES[palette]()
+        self.tile_size = tile_size
+        self.pool_size = pool_size
+        self.cache = TileCache(cache_bytes)
+        self._pools: Dict[Optional[int], DatasetPool] = {}
+        self._lock = threading.Lock()
+
+        with rasterio.open(self.path) as src:
+            self.resolution = min(abs(src.res[0]), abs(src.res[1]))
+            self.overviews = src.overviews(1)
+            self.nodata = src.nodata
+            self.bounds = transform_bounds(src.crs, WEB_MERCATOR, *src.bounds, densify_pts=21)
+
+    def overview_level(self, z: int, y: int) -> Optional[int]:
+        """Returns the index of the coarsest overview that is still at least
+         as fine as the tiles of row `y` at zoom `z`, or None for full
+         resolution.
+        """
+        factor = tile_resolution(z, y, self.tile_size) / self.resolution
+        level = None
+        for i, overview in enumerate(self.overviews):
+            if overview <= factor:
+                level = i
+        return level
+
+    def _pool(self, level: Optional[int]) -> DatasetPool:
+        with self._lock:
+            if level not in self._pools:
+                if level is None:
+                    self._pools[level] = DatasetPool(lambda: rasterio.open(self.path),
+                                                     self.pool_size)
+                else:
+                    self._pools[level] = DatasetPool(
+                        lambda: rasterio.open(self.path, overview_level=level), self.pool_size)
+            return self._pools[level]
+
+    @property
+    def open_datasets(self) -> int:
+        """Returns the number of datasets currently open."""
+        with self._lock:
+            return sum(len(pool) for pool in self._pools.values())
+
+    def intersects(self, z: int, x: int, y: int) -> bool:
+        left, bottom, right, top = tile_bounds(z, x, y)
+        return not (right <= self.bounds[0] or left >= self.bounds[2] or top <= self.bounds[1]
+                    or bottom >= self.bounds[3])
+
+    def render(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """Returns the PNG of an XYZ tile, or None if the tile is outside the
+         COG.
+        """
+        if not (0 <= x < 2**z and 0 <= y < 2**z) or not self.intersects(z, x, y):
+            return None
+
+        key = (self.path, self.palette_name, z, x, y)
+        tile = self.cache.get(key)
+        if tile is not None:
+            return tile
+
+        data = np.full((self.tile_size, self.tile_size), -1, dtype=np.int32)
+        with self._pool(self.overview_level(z, y)).dataset() as dataset:
+            reproject(source=rasterio.band(dataset, 1),
+                      destination=data,
+                      src_nodata=self.nodata,
+                      dst_transform=from_bounds(*tile_bounds(z, x, y), self.tile_size,
+                                                self.tile_size),
+                      dst_crs=WEB_MERCATOR,
+                      dst_nodata=-1,
+                      resampling=Resampling.nearest)
+
+        tile = encode_png(colorize(data, self.palette))
+        self.cache.put(key, tile)
+        return tile
+
+    def close(self) -> None:
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools = {}
+
+
+TILE_PATH = re.compile(r"^/(\d+)/(\d+)/(\d+)\.png$")
+
+
+def tile_server(renderer: TileRenderer, host: str = "127.0.0.1", port: int = 8000) -> Any:
+    """Returns a threaded HTTP server for local development, serving
+     `/{z}/{x}/{y}.png` tiles from `renderer` and the cache counters at
+     `/stats`. Call its `serve_forever` method to run it.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            match = TILE_PATH.match(self.path)
+            if self.path == "/stats":
+                self._send(200, "application/json", json.dumps(renderer.cache.stats()).encode())
+            elif match:
+                z, x, y = (int(group) for group in match.groups())
+                tile = renderer.render(z, x, y)
+                if tile is None:
+                    self._send(404, "text/plain", b"Tile outside the COG")
+                else:
+                    self._send(200, "image/png", tile)
+            else:
+                self._send(404, "text/plain", b"Not found")
+
+        def _send(self, status: int, content_type: str, body: bytes) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(body)
+
+    return ThreadingHTTPServer((host, port), Handler)
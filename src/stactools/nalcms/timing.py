@@ -0,0 +1,179 @@
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, TypeVar, cast
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def peak_rss() -> Optional[int]:
+    """Returns the peak resident set size of the process so far, in bytes,
+     or None where it is not available.
+    """
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return int(maxrss if sys.platform == "darwin" else maxrss * 1024)
+
+
+def _children_cpu() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return float(usage.ru_utime + usage.ru_stime)
+
+
+class StageTiming(NamedTuple):
+    """The cost of one run of a stage.
+
+    `cpu` is the CPU time of the process, all threads included, and
+     `children_cpu` that of the subprocesses that ended during the stage,
+     e.g. gdal_translate. `peak_rss` is the peak RSS of the process at the
+     end of the stage.
+    """
+    name: str
+    start: float
+    wall: float
+    cpu: float
+    children_cpu: float
+    peak_rss: Optional[int]
+    attributes: Dict[str, Any]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self._asdict(), "attributes": dict(self.attributes)}
+
+
+class TimingRecorder:
+    """Collects the `StageTiming` of every stage run while it is active, see
+     `start_recording`.
+    """
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.records: List[StageTiming] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: StageTiming) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the count and total wall and CPU times of each stage."""
+        result: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for record in self.records:
+                totals = result.setdefault(record.name, {
+                    "count": 0,
+                    "wall": 0.0,
+                    "cpu": 0.0,
+                    "children_cpu": 0.0
+                })
+                totals["count"] += 1
+                totals["wall"] += record.wall
+                totals["cpu"] += record.cpu
+                totals["children_cpu"] += record.children_cpu
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = [record.to_dict() for record in self.records]
+        return {
+            "started": self.started,
+            "peak_rss": peak_rss(),
+            "summary": self.summary(),
+            "stages": stages,
+        }
+
+    def write(self, path: str) -> None:
+        """Writes the timings as JSON, to stdout if `path` is "-"."""
+        text = json.dumps(self.to_dict(), indent=2, default=str)
+        if path == "-":
+            print(text)
+        else:
+            with open(path, "w") as f:
+                f.write(text + "\n")
+
+
+_recorder: Optional[TimingRecorder] = None
+
+
+def start_recording() -> TimingRecorder:
+    """Starts recording the stages run by any thread, and returns the
+     recorder.
+    """
+    global _recorder
+    _recorder = TimingRecorder()
+    return _recorder
+
+
+def stop_recording() -> Optional[TimingRecorder]:
+    """Stops recording and returns the recorder, if any."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[None]:
+    """Records the wall time, CPU time and peak RSS of a block as a stage,
+     when recording, and logs it as a JSON record on this module's logger.
+     Otherwise it does nothing.
+
+    Args:
+        name (str): The name of the stage, e.g. "save_collection".
+        attributes: Details of this run of the stage, e.g. `item="CAN_2010_30m"`.
+    """
+    recorder = _recorder
+    if recorder is None:
+        yield
+        return
+
+    start = time.time()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    children_cpu = _children_cpu()
+    try:
+        yield
+    finally:
+        record = StageTiming(name=name,
+                             start=start,
+                             wall=time.perf_counter() - wall,
+                             cpu=time.process_time() - cpu,
+                             children_cpu=_children_cpu() - children_cpu,
+                             peak_rss=peak_rss(),
+                             attributes=attributes)
+        recorder.add(record)
+        logger.info(json.dumps(record.to_dict(), default=str))
+
+
+def timed(name: str,
+          attributes: Optional[Callable[..., Dict[str, Any]]] = None) -> Callable[[F], F]:
+    """Decorator recording every call of a function as a `stage`.
+
+    Args:
+        name (str): The name of the stage.
+        attributes (callable): Returns the stage attributes from the call's
+         arguments.
+    """
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with stage(name, **(attributes(*args, **kwargs) if attributes else {})):
+                return func(*args, **kwargs)
+
+        return cast(F, wrapper)
+
+    return decorator
@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import jsonschema
+from pystac import StacIO
+from pystac.serialization import identify_stac_object
+from pystac.utils import make_absolute_href
+from pystac.validation import JsonSchemaSTACValidator
+from pystac.validation.schema_uri_map import SchemaUriMap
+
+try:
+    from referencing import Registry, Resource
+    from referencing.exceptions import Unresolvable
+    from referencing.jsonschema import DRAFT7
+except ImportError:  # pragma: no cover, jsonschema < 4.18
+    Registry = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_CACHE_ENV = "NALCMS_SCHEMA_CACHE"
+BUNDLED_SCHEMAS = os.path.join(os.path.dirname(__file__), "schemas")
+DEFAULT_SCHEMA_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "stactools-nalcms",
+                                    "schemas")
+
+
+def schema_cache_dir(directory: Optional[str] = None) -> str:
+    """Returns the schema cache directory: `directory` if given, else the
+     `NALCMS_SCHEMA_CACHE` environment variable, else
+     `~/.cache/stactools-nalcms/schemas`.
+    """
+    return directory or os.environ.get(SCHEMA_CACHE_ENV) or DEFAULT_SCHEMA_CACHE
+
+
+class SchemaNotCachedError(IOError):
+    """A schema is missing from the cache and the validator is offline."""
+    def __init__(self, schema_uri: str, directory: str) -> None:
+        super().__init__(f'Schema "{schema_uri}" not found in schema cache "{directory}"')
+        self.schema_uri = schema_uri
+
+
+def _read_schemas(directory: str) -> Dict[str, Dict[str, Any]]:
+    schemas = {}
+    if os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            if filename.endswith(".json"):
+                with open(os.path.join(directory, filename)) as f:
+                    schemas[unquote(filename[:-5])] = json.load(f)
+    return schemas
+
+
+class CachedSchemaValidator(JsonSchemaSTACValidator):
+    """A JSON Schema validator that reads the schemas from a local directory.
+
+    Each schema is stored as `<url-quoted URI>.json`. The STAC 1.0.0 core
+     schemas ship with this package and are read first, `directory` adds to
+     or overrides them. When `offline` is True, a schema missing from both,
+     or referenced by a cached schema and missing from it, raises
+     `SchemaNotCachedError`; otherwise it is fetched, and `save` writes every
+     schema fetched so far, including the ones they reference, to the cache.
+
+    Args:
+        directory (str): The schema cache directory.
+        offline (bool): Never fetch schemas over the network.
+        schema_uri_map (SchemaUriMap): The URIs of the schemas of each STAC
+         version, defaults to pystac's.
+    """
+    def __init__(self,
+                 directory: str,
+                 offline: bool = True,
+                 schema_uri_map: Optional[SchemaUriMap] = None) -> None:
+        super().__init__(schema_uri_map)
+        self.directory = directory
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._bundled = _read_schemas(BUNDLED_SCHEMAS)
+        self.schema_cache.update(self._bundled)
+        self.schema_cache.update(_read_schemas(directory))
+
+    def is_cached(self, schema_uri: str) -> bool:
+        """Returns whether a schema is in the cache or can be fetched."""
+        return not self.offline or schema_uri in self.schema_cache
+
+    def get_schema_from_uri(self, schema_uri: str) -> Tuple[Dict[str, Any], Any]:
+        with self._lock:
+            if schema_uri not in self.schema_cache:
+                self.schema_cache[schema_uri] = self._fetch(schema_uri)
+        schema = self.schema_cache[schema_uri]
+        # Referenced schemas are looked up in the cache, and only fetched
+        # through `_fetch`
+        resolver = jsonschema.validators.RefResolver(base_uri=schema_uri,
+                                                     referrer=schema,
+                                                     store=self.schema_cache,
+                                                     handlers={
+                                                         "http": self._fetch,
+                                                         "https": self._fetch
+                                                     })
+        return schema, resolver
+
+    def _validate_from_uri(self, stac_dict: Dict[str, Any], schema_uri: str) -> None:
+        if Registry is None:
+            super()._validate_from_uri(stac_dict, schema_uri)
+            return
+        # jsonschema's deprecated RefResolver loses track of the document a
+        # "#/..." reference is in once it follows a reference to another
+        # schema, so references are resolved with `referencing` instead
+        schema, _ = self.get_schema_from_uri(schema_uri)
+        registry = Registry(retrieve=self._resource).with_resource(  # type: ignore
+            schema_uri, Resource.from_contents(schema, default_specification=DRAFT7))
+        validator_class = jsonschema.validators.validator_for(schema)
+        try:
+            validator_class({"$ref": schema_uri}, registry=registry).validate(stac_dict)
+        except Unresolvable as e:
+            # Report why, e.g. a schema missing from the offline cache
+            cause: BaseException = e
+            while cause.__cause__ is not None:
+                cause = cause.__cause__
+            if isinstance(cause, SchemaNotCachedError):
+                raise cause from e
+            raise IOError(str(cause)) from e
+
+    def _resource(self, schema_uri: str) -> Any:
+        with self._lock:
+            if schema_uri not in self.schema_cache:
+                self.schema_cache[schema_uri] = self._fetch(schema_uri)
+            schema = self.schema_cache[schema_uri]
+        return Resource.from_contents(schema, default_specification=DRAFT7)
+
+    def _fetch(self, schema_uri: str) -> Dict[str, Any]:
+        if self.offline:
+            raise SchemaNotCachedError(schema_uri, self.directory)
+        schema: Dict[str, Any] = json.loads(StacIO.default().read_text(schema_uri))
+        return schema
+
+    def save(self) -> None:
+        """Writes every schema in memory, but the bundled ones, to the cache
+         directory.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        for uri, schema in list(self.schema_cache.items()):
+            if self._bundled.get(uri) is schema:
+                continue
+            with open(os.path.join(self.directory, f"{quote(uri, safe='')}.json"), "w") as f:
+                json.dump(schema, f)
+
+
+class ValidationResult(NamedTuple):
+    """The outcome of validating one STAC object.
+
+    `missing` lists the schemas that were not in the offline cache, the
+     object was validated against the others only.
+    """
+    href: str
+    type: str
+    seconds: float
+    error: Optional[str]
+    missing: Tuple[str, ...] = ()
+
+
+def read_tree(root_href: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Returns the (HREF, JSON) of a STAC object and every child and item
+     below it, read from their files.
+
+    Args:
+        root_href (str): HREF of the root Catalog or Collection.
+    """
+    stac_io = StacIO.default()
+    objects = []
+    pending = [root_href]
+    seen = set()
+    while pending:
+        href = pending.pop(0)
+        if href in seen:
+            continue
+        seen.add(href)
+        stac_dict = json.loads(stac_io.read_text(href))
+        objects.append((href, stac_dict))
+        for link in stac_dict.get("links", []):
+            if link["rel"] in ("child", "item"):
+                pending.append(make_absolute_href(link["href"], href))
+    return objects
+
+
+def validate_object(validator: JsonSchemaSTACValidator, href: str,
+                    stac_dict: Dict[str, Any]) -> ValidationResult:
+    """Validates one STAC object against its core and extension schemas,
+     returning the outcome instead of raising. A schema missing from the
+     offline cache is skipped and listed in `ValidationResult.missing`.
+
+    Args:
+        validator (JsonSchemaSTACValidator): The validator to use.
+        href (str): HREF of the object, used in messages.
+        stac_dict (dict): The object's JSON.
+    """
+    start = time.perf_counter()
+    error = None
+    missing: List[str] = []
+    object_type = stac_dict.get("type", "")
+    try:
+        # As pystac does, so that e.g. tuples validate as arrays
+        stac_dict = json.loads(json.dumps(stac_dict))
+        info = identify_stac_object(stac_dict)
+        object_type = str(info.object_type)
+        stac_version = stac_dict["stac_version"]
+        try:
+            validator.validate_core(stac_dict, info.object_type, stac_version, href)
+        except SchemaNotCachedError as e:
+            missing.append(e.schema_uri)
+        for extension in info.extensions:
+            if isinstance(validator, CachedSchemaValidator) and not validator.is_cached(extension):
+                missing.append(extension)
+                continue
+            try:
+                validator.validate_extension(stac_dict, info.object_type, stac_version, extension,
+                                             href)
+            except SchemaNotCachedError as e:
+                missing.append(e.schema_uri)
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    return ValidationResult(href, object_type, time.perf_counter() - start, error, tuple(missing))
+
+
+def missing_schemas(results: List[ValidationResult]) -> List[str]:
+    """Returns the schemas the objects were not validated against because
+     they were missing from the offline cache, in order.
+    """
+    return sorted({uri for result in results for uri in result.missing})
+
+
+def validate_tree(root_href: str,
+                  schema_cache: Optional[str] = None,
+                  offline: bool = True,
+                  workers: int = 1) -> List[ValidationResult]:
+    """Validates a STAC object and every child and item below it against the
+     JSON schemas in a local cache.
+
+    All objects are validated, a failure does not stop the others. Offline,
+     schemas missing from the cache are skipped, see `ValidationResult`. With
+     `offline=False` they are fetched and added to the cache.
+
+    Args:
+        root_href (str): HREF of the root Catalog or Collection.
+        schema_cache (str): The schema cache directory, see `schema_cache_dir`.
+        offline (bool): Never fetch schemas over the network.
+        workers (int): Number of threads used to validate the objects.
+
+    Returns:
+        list: A `ValidationResult` per object, in the order they were read.
+    """
+    validator = CachedSchemaValidator(schema_cache_dir(schema_cache), offline)
+    objects = read_tree(root_href)
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda o: validate_object(validator, *o), objects))
+    else:
+        results = [validate_object(validator, href, stac_dict) for href, stac_dict in objects]
+
+    if not offline:
+        validator.save()
+
+    return results
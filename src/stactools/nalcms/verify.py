@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import aiohttp
+
+from stactools.nalcms.constants import HREF_DIR
+from stactools.nalcms.products import archives, iter_products
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteAsset(NamedTuple):
+    """A file on the CEC server that Item assets link to."""
+    href: str
+    role: str
+    products: List[str]
+
+
+class AssetCheck(NamedTuple):
+    """The answer of the server for a remote asset.
+
+    `size` is the Content-Length, or the total of the Content-Range, reported
+     by the server, and `seconds` the latency of the request(s). The size is
+     only reported: `FILE_SIZES` are the sizes of the GeoTIFFs, not of the
+     archives they ship in, so there is nothing to compare it with.
+    """
+    asset: RemoteAsset
+    status: Optional[int]
+    size: Optional[int]
+    seconds: float
+    error: Optional[str]
+
+    @property
+    def missing(self) -> bool:
+        return self.error is not None
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "href": self.asset.href,
+            "role": self.asset.role,
+            "products": self.asset.products,
+            "status": self.status,
+            "size": self.size,
+            "seconds": self.seconds,
+            "error": self.error,
+            "missing": self.missing,
+        }
+
+
+def remote_assets(href_dir: str = HREF_DIR) -> List[RemoteAsset]:
+    """Returns every unique data archive and metadata document that the
+     Items link to, with the products using them.
+
+    Args:
+        href_dir (str): The base URL of the files, `constants.HREF_DIR` by
+         default.
+    """
+    base = href_dir.rstrip("/") + "/"
+    assets = [
+        RemoteAsset(base + href, "data", [p.id for p in products])
+        for href, products in archives().items()
+    ]
+
+    metadata: Dict[str, List[str]] = {}
+    for product in iter_products():
+        metadata.setdefault(product.href_metadata, []).append(product.id)
+    assets.extend(RemoteAsset(base + href, "metadata", ids) for href, ids in metadata.items())
+    return assets
+
+
+class RateLimiter:
+    """Spaces the start of requests at least `1 / rate` seconds apart.
+
+    Args:
+        rate (float): Requests per second, or None for no limit.
+    """
+    def __init__(self, rate: Optional[float] = None) -> None:
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _range_total(content_range: Optional[str]) -> Optional[int]:
+    # "bytes 0-0/1234"
+    if not content_range or "/" not in content_range:
+        return None
+    total = content_range.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else None
+
+
+async def _check(session: aiohttp.ClientSession, limiter: RateLimiter,
+                 asset: RemoteAsset) -> AssetCheck:
+    await limiter.wait()
+    start = time.perf_counter()
+    status: Optional[int] = None
+    size: Optional[int] = None
+    error: Optional[str] = None
+    try:
+        async with session.head(asset.href, allow_redirects=True) as response:
+            status = response.status
+            size = response.content_length
+
+        # Servers that refuse HEAD, or answer it without a size
+        if status in (403, 405, 501) or (status == 200 and size is None):
+            await limiter.wait()
+            async with session.get(asset.href, headers={"Range": "bytes=0-0"}) as response:
+                status = response.status
+                if status == 206:
+                    size = _range_total(response.headers.get("Content-Range"))
+                else:
+                    size = response.content_length
+
+        if status >= 400:
+            error = f"HTTP {status}"
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        error = str(e) or type(e).__name__
+
+    return AssetCheck(asset, status, size, time.perf_counter() - start, error)
+
+
+async def _verify(assets: List[RemoteAsset], concurrency: int, rate: Optional[float],
+                  timeout: float) -> List[AssetCheck]:
+    limiter = RateLimiter(rate)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        return list(await asyncio.gather(*(_check(session, limiter, asset)
+                                           for asset in assets)))
+
+
+def verify_assets(href_dir: str = HREF_DIR,
+                  concurrency: int = 8,
+                  rate: Optional[float] = 10.0,
+                  timeout: float = 60.0) -> List[AssetCheck]:
+    """Checks that every remote asset exists, and gets its size, with HEAD
+     requests (or a one byte range request when HEAD
+     is refused) sent concurrently over a pool of connections.
+
+    Args:
+        href_dir (str): The base URL of the files, `constants.HREF_DIR` by
+         default.
+        concurrency (int): Maximum number of open connections.
+        rate (float): Maximum number of requests started per second, or None
+         for no limit.
+        timeout (float): Timeout of each check in seconds.
+
+    Returns:
+        list: The `AssetCheck` of each asset, in `remote_assets` order.
+    """
+    assets = remote_assets(href_dir)
+    logger.info(f"Checking {len(assets)} remote assets")
+    return asyncio.run(_verify(assets, concurrency, rate, timeout))
@@ -0,0 +1,116 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import fsspec
+from fsspec.core import url_to_fs
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+def dumps(stac_dict: Dict[str, Any], indent: bool = True) -> bytes:
+    """Returns the UTF-8 JSON of a STAC object dict.
+
+    Uses orjson when it is installed (`pip install stactools-nalcms[orjson]`),
+     and the standard library json module otherwise.
+
+    Args:
+        stac_dict (dict): The output of a STAC object's `to_dict`.
+        indent (bool): Indent with 2 spaces, as `save_object` does, or write
+         compact JSON without whitespace.
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return bytes(orjson.dumps(stac_dict, option=option))
+
+    if indent:
+        return json.dumps(stac_dict, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(stac_dict, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def write_json(stac_dict: Dict[str, Any], href: str, indent: bool = True) -> None:
+    """Writes a STAC object dict to a JSON file, see `write_bytes`.
+
+    Args:
+        stac_dict (dict): The output of a STAC object's `to_dict`.
+        href (str): The path or URL of the JSON file.
+        indent (bool): Indent with 2 spaces, or write compact JSON.
+    """
+    write_bytes(dumps(stac_dict, indent), href)
+
+
+def write_bytes(data: bytes, href: str) -> None:
+    """Writes a file through fsspec, like pystac's `StacIO` once
+     `stactools.core.use_fsspec` is called: a local path, creating its
+     directory, or a URL such as `s3://bucket/key`.
+    """
+    with fsspec.open(href, "wb") as f:
+        f.write(data)
+
+
+def read_bytes(href: str) -> Optional[bytes]:
+    """Returns the content of a file read through fsspec, or None if it does
+     not exist.
+    """
+    try:
+        with fsspec.open(href, "rb") as f:
+            data: bytes = f.read()
+            return data
+    except FileNotFoundError:
+        return None
+
+
+def read_json(href: str) -> Optional[Any]:
+    """Returns the content of a JSON file read through fsspec, or None if
+     it does not exist or is not valid JSON.
+    """
+    data = read_bytes(href)
+    if data is None:
+        return None
+    try:
+        return json.loads(data)
+    except ValueError:
+        return None
+
+
+def exists(href: str) -> bool:
+    """Returns True if a file exists, locally or at a fsspec URL."""
+    fs, path = url_to_fs(href)
+    return bool(fs.isfile(path))
+
+
+def write_objects(objects: Iterable[Tuple[Dict[str, Any], str]],
+                  workers: int = 1,
+                  indent: bool = True) -> int:
+    """Writes STAC object dicts to JSON files, local or at fsspec URLs, and
+     returns the number of files written.
+
+    Serialization is done on the calling thread, where the dicts are built,
+     and the files are written by `workers` threads.
+
+    Args:
+        objects (iterable): (dict, href) pairs.
+        workers (int): Number of threads writing the files.
+        indent (bool): Indent with 2 spaces, or write compact JSON.
+    """
+    count = 0
+    if workers <= 1:
+        for stac_dict, href in objects:
+            write_json(stac_dict, href, indent)
+            count += 1
+        return count
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(write_bytes, dumps(stac_dict, indent), href)
+            for stac_dict, href in objects
+        ]
+        for future in futures:
+            future.result()
+            count += 1
+    return count
@@ -0,0 +1,101 @@
+"""A local HTTP stand-in for the CEC server."""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple, Union
+
+# File contents by path, or only their size for files too large to hold
+Files = Dict[str, Union[bytes, int]]
+
+
+class StandInServer:
+    """Serves `files` on a free local port with HEAD and single range GET
+     requests, and records the requests it received.
+
+    Args:
+        files (dict): File contents, or sizes, by URL path.
+        allow_head (bool): Answer HEAD requests, or refuse them with 405.
+    """
+    def __init__(self, files: Files, allow_head: bool = True) -> None:
+        self.files = files
+        self.allow_head = allow_head
+        self.requests: List[Tuple[str, str, Optional[str]]] = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/"
+
+    def __enter__(self) -> "StandInServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+            def do_HEAD(self) -> None:
+                server.requests.append(("HEAD", self.path, None))
+                if not server.allow_head:
+                    self._send_empty(405)
+                elif self.path not in server.files:
+                    self._send_empty(404)
+                else:
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(self._size()))
+                    self.send_header("Accept-Ranges", "bytes")
+                    self.end_headers()
+
+            def do_GET(self) -> None:
+                range_header = self.headers.get("Range")
+                server.requests.append(("GET", self.path, range_header))
+                if self.path not in server.files:
+                    self._send_empty(404)
+                    return
+
+                size = self._size()
+                start, end = 0, size - 1
+                if range_header:
+                    first, last = range_header.split("=", 1)[1].split("-")
+                    start = int(first)
+                    end = min(int(last), size - 1) if last else size - 1
+                    if start >= size:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{size}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                else:
+                    self.send_response(200)
+                body = self._content(start, end + 1)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _size(self) -> int:
+                content = server.files[self.path]
+                return content if isinstance(content, int) else len(content)
+
+            def _content(self, start: int, stop: int) -> bytes:
+                content = server.files[self.path]
+                if isinstance(content, int):
+                    return bytes(stop - start)
+                return content[start:stop]
+
+            def _send_empty(self, status: int) -> None:
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        return Handler
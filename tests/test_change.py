@@ -0,0 +1,66 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import numpy as np
+import rasterio
+import rasterio.shutil
+
+from stactools.nalcms import cog
+from stactools.nalcms.change import (CHANGE_NODATA, create_change_cog, encode_change,
+                                     write_change_raster)
+from tests.test_cog import write_raster
+
+
+class TestChange(unittest.TestCase):
+    def test_encode_change(self):
+        before = np.array([[1, 19, -128, 5]], dtype="int8")
+        after = np.array([[15, 19, 3, 127]], dtype="int8")
+
+        codes = encode_change(before, after, -128, 127)
+        self.assertEqual(codes.dtype, np.uint16)
+        self.assertEqual(codes.tolist(), [[115, 1919, CHANGE_NODATA, CHANGE_NODATA]])
+
+    def test_write_change_raster(self):
+        with TemporaryDirectory() as tmp_dir:
+            before = os.path.join(tmp_dir, "before.tif")
+            after = os.path.join(tmp_dir, "after.tif")
+            output = os.path.join(tmp_dir, "change.tif")
+            write_raster(before)
+            write_raster(after)
+            with rasterio.open(after, "r+") as dst:
+                dst.write(np.full((1, 64, 64), 18, dtype="uint8"))
+
+            write_change_raster(before, after, output, workers=3, block_size=16)
+
+            with rasterio.open(before) as src:
+                expected = encode_change(src.read(1), np.full((64, 64), 18))
+                transform = src.transform
+            with rasterio.open(output) as dataset:
+                self.assertEqual(dataset.transform, transform)
+                self.assertEqual(dataset.nodata, CHANGE_NODATA)
+                self.assertIsNone(dataset.compression)
+                np.testing.assert_array_equal(dataset.read(1), expected)
+
+    def test_create_change_cog(self):
+        inputs = []
+
+        def cogify(infile, outfile, args, extra_args):
+            with rasterio.open(infile) as src:
+                inputs.append((infile, src.compression))
+                rasterio.shutil.copy(src, outfile, driver="COG")
+            return 0
+
+        with TemporaryDirectory() as tmp_dir, TemporaryDirectory() as destination, \
+                mock.patch.object(cog, "cogify", cogify):
+            before = os.path.join(tmp_dir, "before.tif")
+            after = os.path.join(tmp_dir, "after.tif")
+            write_raster(before)
+            write_raster(after)
+
+            output = create_change_cog(before, after, destination, "CAN_2010-2015")
+
+            self.assertEqual(output, os.path.join(destination, "CAN_2010-2015_cog.tif"))
+            self.assertEqual(inputs, [(os.path.join(destination, ".CAN_2010-2015.tmp.tif"), None)])
+            self.assertEqual(os.listdir(destination), ["CAN_2010-2015_cog.tif"])
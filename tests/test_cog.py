@@ -0,0 +1,97 @@
+import json
+import os
+import unittest
+import zipfile
+from typing import Any
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from stactools.nalcms.cog import (SUMMARY_FILENAME, cog_path, create_cogs, is_valid_cog,
+                                  cog_args, list_sources, vsi_path)
+
+
+def write_raster(path: str, driver: str = "GTiff", **options: Any) -> None:
+    data = np.arange(64 * 64, dtype="uint8").reshape(1, 64, 64) % 19
+    with rasterio.open(path,
+                       "w",
+                       driver=driver,
+                       width=64,
+                       height=64,
+                       count=1,
+                       dtype="uint8",
+                       crs="EPSG:3978",
+                       transform=from_origin(0, 1920, 30, 30),
+                       **options) as dst:
+        dst.write(data)
+
+
+class TestCOG(unittest.TestCase):
+    def test_create_cogs_skips_existing(self):
+        with TemporaryDirectory() as source, TemporaryDirectory() as destination:
+            write_raster(os.path.join(source, "done.tif"))
+            write_raster(cog_path("done.tif", destination), driver="COG")
+            with open(os.path.join(source, "broken.tif"), "w") as f:
+                f.write("not a tiff")
+
+            sources = list_sources(source)
+            self.assertEqual([os.path.basename(s) for s in sources], ["broken.tif", "done.tif"])
+
+            results = create_cogs(sources, destination, workers=2)
+            self.assertEqual([r.status for r in results], ["failed", "skipped"])
+            self.assertFalse(os.path.exists(cog_path("broken.tif", destination)))
+            self.assertFalse(os.path.exists(cog_path("broken.tif", destination) + ".part"))
+
+            with open(os.path.join(destination, SUMMARY_FILENAME)) as f:
+                summary = json.load(f)
+            self.assertEqual(len(summary), 2)
+            self.assertIn("bytes_per_second", summary[0])
+
+    def test_is_valid_cog(self):
+        with TemporaryDirectory() as tmp_dir:
+            write_raster(os.path.join(tmp_dir, "cog.tif"), driver="COG")
+            write_raster(os.path.join(tmp_dir, "tiff.tif"))
+            self.assertTrue(is_valid_cog(os.path.join(tmp_dir, "cog.tif")))
+            self.assertFalse(is_valid_cog(os.path.join(tmp_dir, "tiff.tif")))
+            self.assertFalse(is_valid_cog(os.path.join(tmp_dir, "missing.tif")))
+
+    def test_list_sources_from_manifest(self):
+        with TemporaryDirectory() as tmp_dir:
+            manifest = os.path.join(tmp_dir, "manifest.txt")
+            with open(manifest, "w") as f:
+                f.write("# products\na.tif\n\nb.tif\n")
+            self.assertEqual(list_sources(manifest), ["a.tif", "b.tif"])
+
+    def test_vsi_path(self):
+        with TemporaryDirectory() as tmp_dir:
+            write_raster(os.path.join(tmp_dir, "canada_2010.tif"))
+            archive = os.path.join(tmp_dir, "canada_2010.zip")
+            with zipfile.ZipFile(archive, "w") as zf:
+                zf.write(os.path.join(tmp_dir, "canada_2010.tif"), "canada_2010/canada_2010.tif")
+                zf.writestr("canada_2010/readme.txt", "")
+
+            path = vsi_path(archive)
+            self.assertEqual(path, f"/vsizip/{archive}/canada_2010/canada_2010.tif")
+            self.assertEqual(vsi_path(f"{archive}/canada_2010/canada_2010.tif"), path)
+            with rasterio.open(path) as dataset:
+                self.assertEqual(dataset.shape, (64, 64))
+
+            self.assertEqual(cog_path(archive, tmp_dir),
+                             os.path.join(tmp_dir, "canada_2010_cog.tif"))
+            self.assertEqual(vsi_path("https://example.com/files/a.zip/a.tif"),
+                             "/vsizip//vsicurl/https://example.com/files/a.zip/a.tif")
+            self.assertEqual(vsi_path("a.tif"), "a.tif")
+
+    def test_cog_args(self):
+        args = cog_args("fast-read", {"compress": "LERC", "BLOCKSIZE": 512, "PREDICTOR": None},
+                        cache_max=256)
+        self.assertEqual(args[:3], ["--config", "GDAL_CACHEMAX", "256"])
+        self.assertIn("COMPRESS=LERC", args)
+        self.assertIn("BLOCKSIZE=512", args)
+        self.assertIn("OVERVIEW_RESAMPLING=MODE", args)
+        self.assertFalse(any(arg.startswith("PREDICTOR") for arg in args))
+
+        with self.assertRaises(ValueError):
+            cog_args("unknown")
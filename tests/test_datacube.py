@@ -0,0 +1,80 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+import click
+import numpy as np
+import rasterio
+from click.testing import CliRunner
+
+from stactools.nalcms.commands import create_nalcms_command
+from tests.test_cog import write_raster
+
+try:
+    import zarr
+
+    from stactools.nalcms.datacube import (CUBE_NODATA, create_datacube, normalize_classes,
+                                           read_pixel_history)
+except ImportError:
+    zarr = None
+
+
+@unittest.skipIf(zarr is None, "zarr is not installed")
+class TestDatacube(unittest.TestCase):
+    def test_normalize_classes(self):
+        data = np.array([[1, 19, -128, 0, 20]], dtype="int8")
+        self.assertEqual(normalize_classes(data, -128).tolist(), [[1, 19, 0, 0, 0]])
+
+    def test_create_datacube(self):
+        with TemporaryDirectory() as tmp_dir:
+            cog_2010 = os.path.join(tmp_dir, "canada_2010.tif")
+            cog_2015 = os.path.join(tmp_dir, "canada_2015.tif")
+            output = os.path.join(tmp_dir, "cube.zarr")
+            write_raster(cog_2010)
+            write_raster(cog_2015)
+            with rasterio.open(cog_2015, "r+") as dst:
+                dst.write(np.full((1, 64, 64), 18, dtype="uint8"))
+
+            root = create_datacube([("2015", cog_2015), ("2010", cog_2010)],
+                                   output,
+                                   "CAN",
+                                   "30",
+                                   workers=3,
+                                   chunk_size=16)
+
+            cube = root["land_cover"]
+            self.assertEqual(cube.shape, (2, 64, 64))
+            self.assertEqual(cube.chunks, (2, 16, 16))
+            self.assertEqual(root.attrs["years"], ["2010", "2015"])
+            self.assertEqual(root.attrs["source_nodata"], {"2010": -128.0, "2015": -128.0})
+            self.assertEqual(root.attrs["legend"]["1"], "Temperate or sub-polar needleleaf forest")
+            self.assertEqual(cube.attrs["_ARRAY_DIMENSIONS"], ["time", "y", "x"])
+            self.assertEqual(str(root["time"][0]), "2010-01-01")
+
+            with rasterio.open(cog_2010) as src:
+                expected = normalize_classes(src.read(1))
+            np.testing.assert_array_equal(cube[0], expected)
+            np.testing.assert_array_equal(cube[1], np.full((64, 64), 18))
+            self.assertEqual(CUBE_NODATA, cube[0, 0, 0])
+
+            # Pixel (row 1, col 2), from the 30 m grid at (0, 1920)
+            self.assertEqual(read_pixel_history(output, 75.0, 1875.0), {
+                "2010": int(expected[1, 2]),
+                "2015": 18
+            })
+            with self.assertRaises(ValueError):
+                read_pixel_history(output, -15.0, 1875.0)
+
+    def test_create_datacube_command(self):
+        cli = click.Group()
+        create_nalcms_command(cli)
+        with TemporaryDirectory() as tmp_dir:
+            source = os.path.join(tmp_dir, "mexico_2010.tif")
+            output = os.path.join(tmp_dir, "cube.zarr")
+            write_raster(source)
+            result = CliRunner().invoke(cli, [
+                "nalcms", "create-datacube", "-o", output, "-i", "2010", source, "-r", "MEX",
+                "--chunk-size", "32"
+            ])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertEqual(zarr.open_group(output, mode="r")["land_cover"].shape, (1, 64, 64))
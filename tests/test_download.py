@@ -0,0 +1,120 @@
+import json
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from stactools.nalcms import download
+from stactools.nalcms.download import download_archives, download_file, select_archives
+from tests.http_server import StandInServer
+
+
+def content(size: int) -> bytes:
+    return bytes(i % 251 for i in range(size))
+
+
+class TestDownload(unittest.TestCase):
+    def test_select_archives(self):
+        self.assertEqual(len(select_archives()), 15)
+
+        selected = select_archives(periods=["yearly"], regions=["ASK", "USA"])
+        self.assertEqual(
+            sorted(selected.keys()),
+            ["2010nalcms30m/united_states_2010.zip", "2010nalcms30m/united_states_2015_v2.zip"])
+        for products in selected.values():
+            self.assertEqual(sorted(p.region for p in products), ["ASK", "USA"])
+
+        selected = select_archives(gsds=["250"], regions=["HI"])
+        self.assertEqual(list(selected.keys()), ["Land_Cover_2005/Land_Cover_2005v3_TIFF.zip"])
+
+    def test_download_archives(self):
+        hrefs = list(select_archives(regions=["ASK"]).keys())
+        files = {f"/files/{href}": content(10000 + i) for i, href in enumerate(hrefs)}
+
+        with StandInServer(files) as server, TemporaryDirectory() as cache, \
+                TemporaryDirectory() as destination:
+            href_dir = server.url + "files/"
+
+            results = download_archives(destination, cache, href_dir, regions=["USA", "ASK"],
+                                        workers=4, chunk_size=1000)
+            # Each archive is downloaded once for both regions
+            self.assertEqual(len(results), 3)
+            for result, href in zip(results, hrefs):
+                self.assertFalse(result.cached)
+                self.assertEqual(result.products, [f"USA_{result.products[0][4:-4]}_30m",
+                                                   f"ASK_{result.products[0][4:-4]}_30m"])
+                self.assertEqual(result.path,
+                                 os.path.join(destination, os.path.basename(href)))
+                with open(result.path, "rb") as f:
+                    self.assertEqual(f.read(), files[f"/files/{href}"])
+                self.assertTrue(os.path.isfile(os.path.join(cache, href)))
+
+            ranges = [r for method, _, r in server.requests if method == "GET"]
+            self.assertEqual(len(ranges), sum(-(-len(c) // 1000) for c in files.values()))
+
+            server.requests.clear()
+            results = download_archives(destination, cache, href_dir, regions=["ASK"])
+            self.assertTrue(all(result.cached for result in results))
+            self.assertEqual(sum(result.downloaded for result in results), 0)
+            self.assertEqual(server.requests, [])
+
+    def test_resume(self):
+        data = content(5000)
+        with StandInServer({"/archive.zip": data}) as server, TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "archive.zip")
+            url = server.url + "archive.zip"
+
+            # An interrupted download with the first two chunks written
+            with open(path + ".part", "wb") as f:
+                f.write(data[:2000] + bytes(3000))
+            with open(path + ".part.json", "w") as f:
+                json.dump({
+                    "url": url,
+                    "size": 5000,
+                    "validator": None,
+                    "chunk_size": 1000,
+                    "done": [0, 1]
+                }, f)
+
+            size, downloaded = download_file(url, path, workers=2, chunk_size=1000)
+
+            self.assertEqual((size, downloaded), (5000, 3000))
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), data)
+            self.assertFalse(os.path.exists(path + ".part"))
+            self.assertFalse(os.path.exists(path + ".part.json"))
+            ranges = sorted(r for method, _, r in server.requests if method == "GET")
+            self.assertEqual(ranges, ["bytes=2000-2999", "bytes=3000-3999", "bytes=4000-4999"])
+
+            # Resumed with another chunk size, the recorded chunks are not reused
+            with open(path + ".part", "wb") as f:
+                f.write(data[:2000] + bytes(3000))
+            with open(path + ".part.json", "w") as f:
+                json.dump({
+                    "url": url,
+                    "size": 5000,
+                    "validator": None,
+                    "chunk_size": 1000,
+                    "done": [0, 1]
+                }, f)
+            os.remove(path)
+
+            size, downloaded = download_file(url, path, workers=2, chunk_size=2500)
+
+            self.assertEqual((size, downloaded), (5000, 5000))
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), data)
+
+    def test_incomplete_download(self):
+        data = content(5000)
+        with StandInServer({"/archive.zip": data}) as server, TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "archive.zip")
+            url = server.url + "archive.zip"
+
+            # A server without range support sending less than it announced
+            with mock.patch.object(download, "_remote_file", return_value=(6000, None, False)):
+                with self.assertRaisesRegex(IOError, "Downloaded 5000 bytes"):
+                    download_file(url, path)
+
+            self.assertFalse(os.path.exists(path))
+            self.assertTrue(os.path.exists(path + ".part"))
@@ -0,0 +1,56 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from stactools.nalcms import header
+from stactools.nalcms.header import clear_header_cache, read_header
+from stactools.nalcms.stac import create_item
+from tests.test_cog import write_raster
+
+
+class TestHeader(unittest.TestCase):
+    def test_read_header(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "cog.tif")
+            write_raster(path, driver="COG")
+
+            clear_header_cache()
+            raster_header = read_header(path)
+            self.assertEqual(raster_header.epsg, 3978)
+            self.assertEqual(raster_header.shape, [64, 64])
+            self.assertEqual(raster_header.bounds, [0.0, 0.0, 1920.0, 1920.0])
+            self.assertEqual(raster_header.data_type, "uint8")
+            self.assertEqual(raster_header.file_size, os.path.getsize(path))
+
+            # Densified footprint, closed, inside the bbox
+            coordinates = raster_header.geometry["coordinates"][0]
+            self.assertEqual(len(coordinates), 4 * 21 + 1)
+            self.assertEqual(coordinates[0], coordinates[-1])
+            west, south, east, north = raster_header.bbox
+            for lon, lat in coordinates:
+                self.assertTrue(west <= lon <= east and south <= lat <= north)
+
+            self.assertIs(read_header(path), raster_header)
+            self.assertEqual(header._read_header.cache_info().hits, 1)
+
+            # A changed file is read again
+            write_raster(path)
+            self.assertIsNot(read_header(path), raster_header)
+
+    def test_create_item_from_header(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "cog.tif")
+            write_raster(path, driver="COG")
+
+            item = create_item("CAN", "30", "2010", path, from_header=True)
+            raster_header = read_header(path)
+
+            self.assertEqual(item.bbox, raster_header.bbox)
+            self.assertEqual(item.properties["proj:epsg"], 3978)
+            self.assertEqual(item.properties["proj:shape"], [64, 64])
+            asset = item.assets["data"]
+            self.assertEqual(asset.extra_fields["file:size"], os.path.getsize(path))
+            self.assertEqual(asset.extra_fields["raster:bands"][0]["data_type"], "uint8")
+
+            item.geometry["coordinates"][0][0][0] = 0.0
+            self.assertNotEqual(raster_header.geometry["coordinates"][0][0][0], 0.0)
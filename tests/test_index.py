@@ -0,0 +1,57 @@
+import unittest
+from datetime import datetime
+
+from stactools.nalcms.index import ProductIndex
+from stactools.nalcms.products import extent_errors, get_product
+from stactools.nalcms.stac import iter_items
+
+
+class TestIndex(unittest.TestCase):
+    def test_find_items(self):
+        index = ProductIndex.from_constants()
+        self.assertEqual(len(index), 19)
+
+        # Around Ottawa
+        ottawa = [-76.0, 45.0, -75.5, 45.5]
+        ids = {e.id for e in index.find_items(ottawa, "2012-06-01T00:00:00Z", gsd=30)}
+        self.assertEqual(ids, {"CAN_2010-2015_30m", "NA_2010-2015_30m", "USA_2010-2015_30m"})
+
+        ids = {e.id for e in index.find_items(ottawa, (datetime(2005, 6, 1), None), gsd="250")}
+        self.assertEqual(ids, {"NA_2005_250m", "NA_2010_250m", "NA_2005-2010_250m"})
+
+        ids = {e.id for e in index.find_items([-157.0, 20.0, -156.0, 21.0], "2005-01-01/..")}
+        self.assertIn("HI_2005_250m", ids)
+        self.assertNotIn("HI_2005_250m", {e.id for e in index.find_items(ottawa)})
+
+        self.assertEqual(index.find_items(datetime="2020-01-01T00:00:00Z"), [])
+        self.assertEqual(len(index.find_items()), 19)
+
+    def test_inverted_extents_are_data_errors(self):
+        errors = extent_errors()
+        self.assertEqual([error.split(":")[0] for error in errors],
+                         ["30m_2010_ASK", "30m_2015_ASK"])
+
+        with self.assertLogs("stactools.nalcms.index", "WARNING") as logs:
+            index = ProductIndex.from_constants()
+        self.assertEqual(len(logs.output), 2)
+        ids = {e.id for e in index.find_items([-75.7, 45.4, -75.7, 45.4])}
+        self.assertFalse(any(id.startswith("ASK") for id in ids))
+        self.assertIn("ASK_2010_30m", {e.id for e in index.find_items()})
+
+    def test_from_items(self):
+        index = ProductIndex.from_items(iter_items())
+        constants_index = ProductIndex.from_constants()
+        self.assertEqual(sorted((e.id, e.bbox) for e in index.entries),
+                         sorted((e.id, e.bbox) for e in constants_index.entries))
+        can = next(e for e in index.entries if e.id == "CAN_2010_30m")
+        west, south, east, north = can.bbox
+        self.assertLess(west, east)
+        self.assertLess(south, north)
+        self.assertEqual(can.bbox, get_product("CAN", "30", "2010").bbox)
+
+        # A point in Ottawa
+        ottawa = [-75.7, 45.4, -75.7, 45.4]
+        ids = {e.id for e in index.find_items(ottawa)}
+        self.assertEqual(ids, {e.id for e in constants_index.find_items(ottawa)})
+        self.assertIn("CAN_2010_30m", ids)
+        self.assertEqual(len(index.find_items(datetime="2015-06-01T00:00:00Z", gsd=30)), 10)
@@ -1,3 +1,5 @@
+import subprocess
+import sys
 import unittest
 
 import stactools.nalcms
@@ -6,3 +8,14 @@ import stactools.nalcms
 class TestModule(unittest.TestCase):
     def test_version(self):
         self.assertIsNotNone(stactools.nalcms.__version__)
+
+    def test_cli_startup_is_lazy(self):
+        # Loading the stac CLI must not import the NALCMS modules or rasterio
+        code = ("import sys, stactools.cli.cli; "
+                "print(' '.join(m for m in sys.modules "
+                "if m.startswith('stactools.nalcms.') or m == 'rasterio'))")
+        output = subprocess.run([sys.executable, "-c", code],
+                                check=True,
+                                stdout=subprocess.PIPE,
+                                universal_newlines=True).stdout
+        self.assertEqual(output.split(), ["stactools.nalcms.commands"])
@@ -0,0 +1,71 @@
+import json
+import os
+import unittest
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+
+import shapely.wkb
+
+from stactools.nalcms.products import get_product
+from stactools.nalcms.stac import iter_items
+
+try:
+    import pyarrow.parquet as pq
+
+    from stactools.nalcms.parquet import read_parquet, write_parquet
+except ImportError:
+    pq = None
+
+
+@unittest.skipIf(pq is None, "pyarrow is not installed")
+class TestParquet(unittest.TestCase):
+    def test_write_parquet(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "items.parquet")
+            count = write_parquet(iter_items(compact=True), path, row_group_size=5)
+            self.assertEqual(count, 19)
+
+            parquet_file = pq.ParquetFile(path)
+            self.assertEqual(parquet_file.num_row_groups, 4)
+            geo = json.loads(parquet_file.schema_arrow.metadata[b"geo"])
+            self.assertEqual(geo["columns"]["geometry"]["encoding"], "WKB")
+            self.assertEqual(geo["columns"]["geometry"]["geometry_types"], ["Polygon"])
+
+            table = pq.read_table(path, filters=[("gsd", "=", 250.0)])
+            self.assertEqual(sorted(table.column("id").to_pylist()),
+                             ["HI_2005_250m", "NA_2005-2010_250m", "NA_2005_250m", "NA_2010_250m"])
+            row = {row["id"]: row for row in table.to_pylist()}["NA_2005-2010_250m"]
+            self.assertEqual(row["start_datetime"], datetime(2005, 1, 1, tzinfo=timezone.utc))
+            self.assertEqual(row["end_datetime"], datetime(2010, 12, 31, tzinfo=timezone.utc))
+            west, south, east, north = get_product("NA", "250", "2005-2010").bbox
+            self.assertEqual(row["bbox"], {
+                "xmin": west,
+                "ymin": south,
+                "xmax": east,
+                "ymax": north
+            })
+            self.assertLess(row["bbox"]["xmin"], -100.0)
+            self.assertEqual(shapely.wkb.loads(row["geometry"]).bounds,
+                             (west, south, east, north))
+            self.assertEqual(dict(row["assets"])["data"].rsplit("/", 1)[1],
+                             "LC_05-10_change_TIFF.zip")
+
+    def test_read_parquet(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "items.parquet")
+            write_parquet(iter_items(["yearly"]), path, row_group_size=4)
+
+            expected = [
+                json.loads(json.dumps(item.to_dict(include_self_link=False)))
+                for item in iter_items(["yearly"])
+            ]
+            self.assertEqual([item.to_dict() for item in read_parquet(path)], expected)
+
+            items = list(read_parquet(path, filters=[("id", "=", "CAN_2010_30m")]))
+            self.assertEqual([item.id for item in items], ["CAN_2010_30m"])
+
+    def test_write_empty(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "items.parquet")
+            self.assertEqual(write_parquet([], path), 0)
+            self.assertEqual(list(read_parquet(path)), [])
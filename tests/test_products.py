@@ -0,0 +1,29 @@
+import itertools as it
+import unittest
+
+from stactools.nalcms.constants import GSDS, HREFS_ZIP, PERIODS, REGIONS
+from stactools.nalcms.products import PRODUCTS, check_products, get_product, iter_products
+
+
+class TestProducts(unittest.TestCase):
+    def test_check_products(self):
+        check_products()
+        self.assertEqual(len(PRODUCTS), len(HREFS_ZIP))
+
+    def test_get_product(self):
+        product = get_product("NA", 250, "2005-2010")
+        self.assertIsNotNone(product)
+        self.assertEqual(product.id, "NA_2005-2010_250m")
+        self.assertEqual(product.key, "250m_2005-2010_NA")
+        self.assertEqual(product.href_zip, HREFS_ZIP["250m_2005-2010_NA"])
+
+        self.assertIsNone(get_product("HI", "30", "2005"))
+
+    def test_iter_products(self):
+        for period in PERIODS.keys():
+            expected = [(reg, gsd, year)
+                        for reg, gsd, year in it.product(REGIONS.keys(), GSDS, PERIODS[period])
+                        if f"{gsd}m_{year}_{reg}" in HREFS_ZIP]
+            self.assertEqual([(p.region, p.gsd, p.year) for p in iter_products(period)],
+                             expected)
+        self.assertEqual(len(list(iter_products())), len(PRODUCTS))
@@ -1,6 +1,41 @@
+import json
+import os
 import unittest
+import zipfile
+from io import StringIO
+from tempfile import TemporaryDirectory
+from urllib.parse import quote
 
-from stactools.nalcms.stac import (create_period_collection, create_item)
+import click
+from click.testing import CliRunner
+from pystac import STACObjectType
+from pystac.serialization import identify_stac_object
+from pystac.validation.schema_uri_map import DefaultSchemaUriMap
+
+from stactools.nalcms import stac
+from stactools.nalcms.commands import create_nalcms_command
+from stactools.nalcms.manifest import MANIFEST_FILENAME
+from stactools.nalcms.products import get_product
+from stactools.nalcms.validate import (CachedSchemaValidator, missing_schemas, read_tree,
+                                       validate_object, validate_tree)
+from stactools.nalcms.stac import (create_period_collection, create_item, create_full_collection,
+                                   save_collection, clear_item_templates, iter_items,
+                                   write_ndjson)
+
+# A schema cache holding the STAC 1.1.0 core and GeoJSON schemas
+SCHEMA_CACHE = os.path.join(os.path.dirname(__file__), "data-files", "schemas")
+
+
+class CoreSchemaUriMap(DefaultSchemaUriMap):
+    """The URIs of the STAC 1.1.0 core schemas, which pystac 1.1 does not
+     know about.
+    """
+    def get_object_schema_uri(self, object_type, stac_version):
+        if stac_version == "1.1.0":
+            spec = {STACObjectType.ITEM: "item", STACObjectType.COLLECTION: "collection"}
+            name = spec[object_type]
+            return f"https://schemas.stacspec.org/v1.1.0/{name}-spec/json-schema/{name}.json"
+        return super().get_object_schema_uri(object_type, stac_version)
 
 
 class TestSTAC(unittest.TestCase):
@@ -48,6 +83,41 @@ class TestSTAC(unittest.TestCase):
 
         item.validate()
 
+    def test_create_compact_item(self):
+        item = create_item("NA", "30", "2010-2015", "cog_filename.tif", compact=True)
+        full_item = create_item("NA", "30", "2010-2015", "cog_filename.tif")
+
+        asset = item.assets["data"]
+        assert "file:size" in asset.extra_fields
+        assert "file:values" not in asset.extra_fields
+        assert "label:classes" not in item.properties
+        assert "label:type" in item.properties
+
+        self.assertLess(len(json.dumps(item.to_dict())), len(json.dumps(full_item.to_dict())) / 10)
+
+    def test_item_templates_are_cached(self):
+        clear_item_templates()
+        first = create_item("CAN", "30", "2010", "first.tif")
+        first.geometry["coordinates"][0][0][0] = 0.0
+        first.properties["label:classes"][0]["classes"].append(99)
+        second = create_item("CAN", "30", "2010", "second.tif")
+
+        self.assertEqual(stac._item_template.cache_info().hits, 1)
+        self.assertEqual(second.assets["data"].href, "second.tif")
+        self.assertNotEqual(second.geometry["coordinates"][0][0][0], 0.0)
+        self.assertNotIn(99, second.properties["label:classes"][0]["classes"])
+
+        clear_item_templates()
+        self.assertEqual(stac._item_template.cache_info().currsize, 0)
+
+    def test_period_collection_describes_item_assets(self):
+        collection = create_period_collection("change")
+        item_assets = collection.extra_fields["item_assets"]
+
+        item = create_item("NA", "30", "2010-2015", "")
+        self.assertEqual(set(item_assets.keys()), set(item.assets.keys()))
+        self.assertEqual(len(item_assets["data"]["file:values"]), 361)
+
     def test_create_collection(self):
         collection = create_period_collection("yearly")
 
@@ -64,3 +134,232 @@ class TestSTAC(unittest.TestCase):
         assert "label:classes" in summaries
 
         collection.validate()
+
+    def test_parallel_collection_matches_serial(self):
+        with TemporaryDirectory() as serial_dir, TemporaryDirectory() as parallel_dir:
+            for destination, workers in [(serial_dir, 1), (parallel_dir, 4)]:
+                root_col = create_full_collection(workers)
+                root_col.normalize_hrefs(destination)
+                save_collection(root_col, workers)
+
+            serial_files = sorted(
+                os.path.relpath(os.path.join(d, f), serial_dir)
+                for d, _, files in os.walk(serial_dir) for f in files)
+            parallel_files = sorted(
+                os.path.relpath(os.path.join(d, f), parallel_dir)
+                for d, _, files in os.walk(parallel_dir) for f in files)
+            self.assertEqual(serial_files, parallel_files)
+            self.assertEqual(len(serial_files), 22)
+
+            for path in serial_files:
+                with open(os.path.join(serial_dir, path), "rb") as serial, \
+                        open(os.path.join(parallel_dir, path), "rb") as parallel:
+                    # Only the root's absolute self link differs between the two
+                    self.assertEqual(
+                        serial.read().replace(serial_dir.encode(), b""),
+                        parallel.read().replace(parallel_dir.encode(), b""),
+                        path,
+                    )
+
+    def test_write_ndjson(self):
+        stream = StringIO()
+        count = write_ndjson(iter_items(["change"], compact=True), stream)
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(count, len(lines))
+        self.assertEqual(count, len(list(iter_items(["change"]))))
+        for line in lines:
+            item = json.loads(line)
+            self.assertEqual(item["type"], "Feature")
+            self.assertNotIn("label:classes", item["properties"])
+            self.assertFalse(any(link["rel"] == "self" for link in item["links"]))
+
+    def test_incremental_save(self):
+        with TemporaryDirectory() as destination:
+
+            def build():
+                root_col = create_full_collection()
+                root_col.normalize_hrefs(destination)
+                save_collection(root_col, incremental=True)
+
+            def mtimes():
+                return {
+                    os.path.join(d, f): os.stat(os.path.join(d, f)).st_mtime_ns
+                    for d, _, files in os.walk(destination) for f in files
+                    if f != MANIFEST_FILENAME
+                }
+
+            build()
+            manifest_path = os.path.join(destination, MANIFEST_FILENAME)
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            self.assertEqual(len(manifest["items"]), 19)
+
+            for path in mtimes():
+                os.utime(path, ns=(0, 0))
+            manifest["items"]["CAN_2010_30m"]["fingerprint"] = "stale"
+            with open(manifest_path, "w") as f:
+                json.dump(manifest, f)
+
+            build()
+            changed = [path for path, mtime in mtimes().items() if mtime != 0]
+            self.assertEqual([os.path.basename(path) for path in changed], ["CAN_2010_30m.json"])
+
+            # Every Item is rewritten when the write options change
+            for path in mtimes():
+                os.utime(path, ns=(0, 0))
+            root_col = create_full_collection()
+            root_col.normalize_hrefs(destination)
+            save_collection(root_col, incremental=True, indent=False)
+            changed = [path for path, mtime in mtimes().items() if mtime != 0]
+            self.assertEqual(len(changed), 22)
+
+    def test_find_source(self):
+        with TemporaryDirectory() as source_dir:
+            product = get_product("HI", "250", "2005")
+            self.assertEqual(stac.find_source(product, source_dir), "")
+
+            # An archive shared with the NA product
+            archive = os.path.join(source_dir, "Land_Cover_2005v3_TIFF.zip")
+            with zipfile.ZipFile(archive, "w") as zf:
+                zf.writestr("Land_Cover_2005v3_TIFF/LC_2005_NA.tif", b"")
+                zf.writestr("Land_Cover_2005v3_TIFF/LC_2005_HI.tif", b"")
+            self.assertEqual(stac.find_source(product, source_dir),
+                             f"{archive}/Land_Cover_2005v3_TIFF/LC_2005_HI.tif")
+
+            cog = os.path.join(source_dir, "LC_2005_HI_cog.tif")
+            with open(cog, "wb") as f:
+                f.write(b"")
+            self.assertEqual(stac.find_source(product, source_dir), cog)
+            self.assertEqual(stac.find_source(get_product("NA", "250", "2005"), source_dir),
+                             f"{archive}/Land_Cover_2005v3_TIFF/LC_2005_NA.tif")
+
+    def test_incremental_save_detects_changed_source(self):
+        with TemporaryDirectory() as destination, TemporaryDirectory() as source_dir:
+            # The COG is named after the GeoTIFF in the archive
+            with zipfile.ZipFile(os.path.join(source_dir, "canada_2010.zip"), "w") as zf:
+                zf.writestr("CAN_NALCMS_2010_v2_land_cover_30m.tif", b"")
+            source = os.path.join(source_dir, "CAN_NALCMS_2010_v2_land_cover_30m_cog.tif")
+            with open(source, "wb") as f:
+                f.write(b"2010")
+
+            def build():
+                root_col = create_full_collection(source_dir=source_dir)
+                root_col.normalize_hrefs(destination)
+                save_collection(root_col, incremental=True)
+
+            def mtimes():
+                return {
+                    os.path.join(d, f): os.stat(os.path.join(d, f)).st_mtime_ns
+                    for d, _, files in os.walk(destination) for f in files
+                    if f != MANIFEST_FILENAME
+                }
+
+            build()
+            with open(os.path.join(destination, MANIFEST_FILENAME)) as f:
+                entry = json.load(f)["items"]["CAN_2010_30m"]
+            self.assertEqual(entry["source"]["size"], 4)
+
+            for path in mtimes():
+                os.utime(path, ns=(0, 0))
+            build()
+            self.assertEqual([path for path, mtime in mtimes().items() if mtime != 0], [])
+
+            with open(source, "wb") as f:
+                f.write(b"2010 v2")
+            build()
+            changed = [path for path, mtime in mtimes().items() if mtime != 0]
+            self.assertEqual([os.path.basename(path) for path in changed], ["CAN_2010_30m.json"])
+            with open(changed[0]) as f:
+                self.assertEqual(json.load(f)["assets"]["data"]["href"], source)
+
+    def test_validate_against_cached_core_schemas(self):
+        validator = CachedSchemaValidator(SCHEMA_CACHE, schema_uri_map=CoreSchemaUriMap())
+        root_col = create_full_collection()
+        root_col.normalize_hrefs("/tmp/nalcms")
+        item = root_col.get_item("CAN_2010_30m", recursive=True)
+        objects = [root_col.get_children().__next__(), item]
+        for stac_object in objects:
+            stac_dict = stac_object.to_dict(include_self_link=False)
+            # Core only, extension schemas are not in the fixture
+            stac_dict.update(stac_version="1.1.0", stac_extensions=[])
+            href = stac_dict["id"]
+            self.assertIsNone(validate_object(validator, href, stac_dict).error)
+
+            del stac_dict["links"]
+            self.assertIn("Validation failed", validate_object(validator, href, stac_dict).error)
+
+        # A schema referenced by a cached one is never fetched offline, it is
+        # skipped and reported
+        del validator.schema_cache["https://geojson.org/schema/Geometry.json"]
+        stac_dict = item.to_dict(include_self_link=False)
+        stac_dict.update(stac_version="1.1.0", stac_extensions=[])
+        result = validate_object(validator, item.id, stac_dict)
+        self.assertIsNone(result.error)
+        self.assertEqual(result.missing, ("https://geojson.org/schema/Geometry.json", ))
+
+    def test_validate_against_bundled_schemas(self):
+        with TemporaryDirectory() as destination, TemporaryDirectory() as cache:
+            root_col = create_full_collection()
+            root_col.normalize_hrefs(destination)
+            save_collection(root_col)
+
+            results = validate_tree(root_col.get_self_href(), cache, workers=4)
+            self.assertEqual([result.error for result in results], [None] * 22)
+            # The extension schemas are not bundled
+            self.assertIn("https://stac-extensions.github.io/label/v1.0.0/schema.json",
+                          missing_schemas(results))
+            self.assertFalse(any(
+                uri.startswith("https://schemas.stacspec.org") for uri in missing_schemas(results)))
+
+            item_href = root_col.get_item("CAN_2010_30m", recursive=True).get_self_href()
+            with open(item_href) as f:
+                stac_dict = json.load(f)
+            del stac_dict["properties"]["datetime"]
+            error = validate_object(CachedSchemaValidator(cache), item_href, stac_dict).error
+            self.assertIn("Validation failed", error)
+
+    def test_create_collection_command_validates_offline(self):
+        cli = click.Group()
+        create_nalcms_command(cli)
+        with TemporaryDirectory() as destination, TemporaryDirectory() as cache:
+            args = ["nalcms", "create-collection", "-d", destination, "--schema-cache", cache]
+            with self.assertLogs("stactools.nalcms.commands", "WARNING") as logs:
+                result = CliRunner().invoke(cli, args)
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn("6 schemas missing from the schema cache", logs.output[0])
+
+            # An invalid schema in the cache fails the command
+            uri = "https://stac-extensions.github.io/label/v1.0.0/schema.json"
+            with open(os.path.join(cache, f"{quote(uri, safe='')}.json"), "w") as f:
+                json.dump({"required": ["label:missing"]}, f)
+            result = CliRunner().invoke(cli, args)
+            self.assertEqual(result.exit_code, 1, result.output)
+            self.assertIn("of 22 objects failed validation", result.output)
+
+            result = CliRunner().invoke(cli, args + ["--no-validate"])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertTrue(os.path.isfile(os.path.join(destination, "collection.json")))
+
+    def test_validate_tree_offline(self):
+        with TemporaryDirectory() as destination, TemporaryDirectory() as cache:
+            root_col = create_full_collection()
+            root_col.normalize_hrefs(destination)
+            save_collection(root_col)
+            root_href = root_col.get_self_href()
+
+            results = validate_tree(root_href, cache, workers=4)
+            self.assertEqual(len(results), 22)
+            self.assertTrue(all(result.missing for result in results))
+
+            # Permissive schemas for every URI the tree uses
+            validator = CachedSchemaValidator(cache)
+            for _, stac_dict in read_tree(root_href):
+                object_type = identify_stac_object(stac_dict).object_type
+                uris = [validator.schema_uri_map.get_object_schema_uri(object_type, "1.0.0")]
+                for uri in uris + stac_dict.get("stac_extensions", []):
+                    validator.schema_cache[uri] = {}
+            validator.save()
+
+            results = validate_tree(root_href, cache, workers=4)
+            self.assertEqual([result.error for result in results], [None] * 22)
@@ -0,0 +1,78 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import rasterio
+
+from stactools.nalcms.stac import add_class_stats, create_item
+from stactools.nalcms.change import encode_change
+from stactools.nalcms.stats import class_stats, transition_matrix
+from tests.test_cog import write_raster
+
+
+class TestStats(unittest.TestCase):
+    def test_class_stats(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "cog.tif")
+            write_raster(path, driver="COG", blocksize=16)
+            with rasterio.open(path) as dataset:
+                self.assertEqual(len(list(dataset.block_windows(1))), 16)
+                data = dataset.read(1)
+            expected = {int(v): int(c) for v, c in zip(*np.unique(data, return_counts=True))}
+
+            serial = class_stats(path)
+            parallel = class_stats(path, workers=3)
+            self.assertEqual(serial.counts, expected)
+            self.assertEqual(parallel.counts, expected)
+            self.assertEqual(serial.pixel_area, 900.0)
+
+    def test_add_class_stats(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "cog.tif")
+            write_raster(path, driver="COG")
+            stats = class_stats(path, workers=2)
+
+            item = create_item("CAN", "30", "2010", path)
+            add_class_stats(item, stats)
+
+            overview = item.properties["label:overviews"][0]
+            counts = {c["name"]: c["count"] for c in overview["counts"]}
+            # 0 is not a land cover class
+            self.assertNotIn("0", counts)
+            self.assertEqual(counts["18"], stats.counts[18])
+            self.assertEqual(len(counts), 18)
+            self.assertEqual(overview["statistics"][0]["value"], counts["1"] * 900.0)
+
+    def test_transition_matrix(self):
+        with TemporaryDirectory() as tmp_dir:
+            before = os.path.join(tmp_dir, "before.tif")
+            after = os.path.join(tmp_dir, "after.tif")
+            change = os.path.join(tmp_dir, "change.tif")
+            write_raster(before, tiled=True, blockxsize=16, blockysize=16)
+            write_raster(after, tiled=True, blockxsize=16, blockysize=16)
+            with rasterio.open(before) as src:
+                profile = src.profile
+                before_data = src.read(1)
+            after_data = np.flipud(before_data)
+            with rasterio.open(after, "r+") as dst:
+                dst.write(after_data, 1)
+            profile.update(dtype="uint16", nodata=65535)
+            with rasterio.open(change, "w", **profile) as dst:
+                dst.write(encode_change(before_data, after_data), 1)
+
+            expected = np.zeros((19, 19), dtype=np.int64)
+            for b, a in zip(before_data.ravel(), after_data.ravel()):
+                if b and a:
+                    expected[b - 1, a - 1] += 1
+
+            from_yearly = transition_matrix(before=before, after=after, workers=3)
+            from_change = transition_matrix(change=change, workers=2)
+            np.testing.assert_array_equal(from_yearly.counts, expected)
+            np.testing.assert_array_equal(from_change.counts, expected)
+            self.assertEqual(from_change.pixel_area, 900.0)
+
+            class_counts = from_change.to_class_stats().counts
+            self.assertEqual(class_counts[1 * 100 + 18], expected[0, 17])
+            self.assertEqual(sum(class_counts.values()), expected.sum())
+            self.assertEqual(len(from_change.to_dict()["area_m2"]), 19)
@@ -0,0 +1,78 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+from rasterio.transform import from_origin
+from rasterio.windows import Window, transform as window_transform
+
+from stactools.nalcms import cog, subset
+from stactools.nalcms.products import get_product
+from stactools.nalcms.subset import SUBSET_REGIONS, subset_window
+from tests.test_cog import write_raster
+
+
+class TestSubset(unittest.TestCase):
+    def test_subset_window(self):
+        transform = from_origin(0, 1920, 30, 30)
+        window = subset_window(transform, 64, 64, [300, 960, 960, 1620])
+        self.assertEqual((window.col_off, window.row_off, window.width, window.height),
+                         (10, 10, 22, 22))
+
+        with self.assertRaises(ValueError):
+            subset_window(transform, 64, 64, [301, 960, 960, 1620])
+        with self.assertRaises(ValueError):
+            subset_window(transform, 64, 64, [300, -30, 960, 1620])
+
+    def test_regions_inside_mosaic(self):
+        for region in SUBSET_REGIONS:
+            for year in ["2010", "2015", "2010-2015"]:
+                product = get_product(region, "30", year)
+                mosaic = get_product("NA", "30", year)
+                transform = from_origin(mosaic.projection["transform"][2],
+                                        mosaic.projection["transform"][5], 30, 30)
+                height, width = mosaic.projection["shape"]
+                subset_window(transform, width, height, product.projection["bounds"])
+
+    def test_create_subset_cog(self):
+        calls = []
+
+        def cogify(infile, outfile, args, extra_args):
+            # gdal_translate -srcwin, with rasterio
+            calls.append(extra_args)
+            col, row, width, height = [int(value) for value in extra_args[1:]]
+            with rasterio.open(infile) as src:
+                profile = src.profile
+                profile.update(driver="COG",
+                               width=width,
+                               height=height,
+                               transform=window_transform(Window(col, row, width, height),
+                                                          src.transform))
+                with rasterio.open(outfile, "w", **profile) as dst:
+                    dst.write(src.read(window=Window(col, row, width, height)))
+            return 0
+
+        product = get_product("CAN", "30", "2010")
+        projection = dict(product.projection,
+                          wkt=CRS.from_epsg(3978).to_wkt(),
+                          bounds=[480, 480, 1440, 1440])
+        with TemporaryDirectory() as tmp_dir, \
+                mock.patch.object(subset, "get_product",
+                                  return_value=product._replace(projection=projection)), \
+                mock.patch.object(cog, "cogify", cogify):
+            source = os.path.join(tmp_dir, "mosaic.tif")
+            write_raster(source, tiled=True, blockxsize=16, blockysize=16)
+
+            output = subset.create_subset_cog(source, "CAN", "30", "2010", tmp_dir)
+
+            self.assertEqual(output, os.path.join(tmp_dir, "CAN_2010_30m_cog.tif"))
+            self.assertEqual(calls, [["-srcwin", "16", "16", "32", "32"]])
+            self.assertEqual(sorted(os.listdir(tmp_dir)), ["CAN_2010_30m_cog.tif", "mosaic.tif"])
+            with rasterio.open(source) as src:
+                expected = src.read(window=((16, 48), (16, 48)))
+            with rasterio.open(output) as dataset:
+                self.assertEqual(dataset.transform, from_origin(480, 1440, 30, 30))
+                np.testing.assert_array_equal(dataset.read(), expected)
@@ -0,0 +1,144 @@
+import json
+import math
+import os
+import threading
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+from urllib.request import urlopen
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.io import MemoryFile
+from rasterio.warp import transform
+
+from stactools.nalcms.tiles import (DatasetPool, TileCache, TileRenderer, change_palette,
+                                    class_palette, colorize, tile_server)
+from tests.test_cog import write_raster
+
+
+def tile_of(path: str, z: int):
+    # The XYZ tile containing the center of a raster
+    with rasterio.open(path) as src:
+        (lon, ), (lat, ) = transform(src.crs, "EPSG:4326",
+                                     [(src.bounds.left + src.bounds.right) / 2],
+                                     [(src.bounds.bottom + src.bounds.top) / 2])
+    n = 2**z
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return z, x, y
+
+
+class TestTiles(unittest.TestCase):
+    def test_palettes(self):
+        self.assertEqual(class_palette()[18].tolist(), [0x4c, 0x73, 0xa1, 255])
+        self.assertEqual(class_palette()[0].tolist(), [0, 0, 0, 0])
+        self.assertEqual(change_palette()[1518].tolist(), [0x4c, 0x73, 0xa1, 255])
+        self.assertEqual(change_palette()[1515][3], 0x60)
+        self.assertEqual(change_palette()[18][3], 0)
+
+        rgba = colorize(np.array([[18, -1, 5000]]), class_palette())
+        self.assertEqual(rgba.shape, (4, 1, 3))
+        self.assertEqual(rgba[3].tolist(), [[255, 0, 0]])
+
+    def test_tile_cache(self):
+        cache = TileCache(max_bytes=10)
+        cache.put("a", b"1234")
+        cache.put("b", b"5678")
+        self.assertEqual(cache.get("a"), b"1234")
+        cache.put("c", b"9012")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), b"9012")
+        self.assertEqual(cache.stats(), {
+            "tiles": 2,
+            "bytes": 8,
+            "max_bytes": 10,
+            "hits": 2,
+            "misses": 1
+        })
+
+    def test_render(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "land_cover.tif")
+            write_raster(path, tiled=True, blockxsize=16, blockysize=16)
+            with rasterio.open(path, "r+") as dst:
+                dst.build_overviews([2, 4], Resampling.mode)
+
+            renderer = TileRenderer(path)
+            self.assertIsNone(renderer.overview_level(17, 0))
+            # About 100 m and 200 m pixels at 49N
+            self.assertEqual(renderer.overview_level(10, tile_of(path, 10)[2]), 0)
+            self.assertEqual(renderer.overview_level(9, tile_of(path, 9)[2]), 1)
+
+            tile = tile_of(path, 15)
+            png = renderer.render(*tile)
+            with MemoryFile(png) as memfile, memfile.open() as dataset:
+                self.assertEqual((dataset.driver, dataset.count), ("PNG", 4))
+                rgba = dataset.read()
+            # Only land cover classes are drawn, in their colors
+            drawn = rgba[:, rgba[3] > 0].T.tolist()
+            self.assertTrue(drawn)
+            colors = class_palette().tolist()
+            self.assertTrue(all(color in colors for color in drawn))
+
+            self.assertEqual(renderer.render(*tile), png)
+            self.assertIsNone(renderer.render(15, 0, 0))
+            self.assertEqual(renderer.cache.stats()["hits"], 1)
+            self.assertEqual(renderer.cache.stats()["misses"], 1)
+
+            server = tile_server(renderer, port=0)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                url = f"http://127.0.0.1:{server.server_address[1]}"
+                with urlopen(f"{url}/{tile[0]}/{tile[1]}/{tile[2]}.png") as response:
+                    self.assertEqual(response.read(), png)
+                with urlopen(f"{url}/stats") as response:
+                    self.assertEqual(json.load(response)["hits"], 2)
+            finally:
+                server.shutdown()
+                server.server_close()
+                renderer.close()
+
+    def test_dataset_pool(self):
+        opened = []
+
+        def open_dataset():
+            opened.append(mock.Mock())
+            return opened[-1]
+
+        pool = DatasetPool(open_dataset, size=2)
+        with pool.dataset() as first, pool.dataset() as second:
+            self.assertIsNot(first, second)
+        with pool.dataset() as third:
+            self.assertIn(third, [first, second])
+        self.assertEqual(len(pool), 2)
+
+        pool.close()
+        self.assertEqual(len(pool), 0)
+        self.assertTrue(all(dataset.close.called for dataset in opened))
+
+    def test_server_requests_reuse_datasets(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "land_cover.tif")
+            write_raster(path, tiled=True, blockxsize=16, blockysize=16)
+
+            # Every request misses the cache and runs on a new thread
+            renderer = TileRenderer(path, cache_bytes=0, pool_size=2)
+            server = tile_server(renderer, port=0)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                z, x, y = tile_of(path, 15)
+                url = f"http://127.0.0.1:{server.server_address[1]}/{z}/{x}/{y}.png"
+                for _ in range(20):
+                    with urlopen(url) as response:
+                        self.assertEqual(response.status, 200)
+                self.assertEqual(renderer.cache.stats()["misses"], 20)
+                self.assertEqual(renderer.open_datasets, 1)
+            finally:
+                server.shutdown()
+                server.server_close()
+                renderer.close()
+            self.assertEqual(renderer.open_datasets, 0)
@@ -0,0 +1,73 @@
+import json
+import os
+import pstats
+import unittest
+from tempfile import TemporaryDirectory
+
+import click
+from click.testing import CliRunner
+
+from stactools.nalcms import timing
+from stactools.nalcms.commands import create_nalcms_command
+from stactools.nalcms.stac import create_full_collection, save_collection
+
+
+class TestTiming(unittest.TestCase):
+    def tearDown(self):
+        timing.stop_recording()
+
+    def test_stage_without_recorder(self):
+        with timing.stage("noop"):
+            pass
+        self.assertIsNone(timing.stop_recording())
+
+    def test_stage(self):
+        recorder = timing.start_recording()
+        with self.assertRaises(ValueError):
+            with timing.stage("work", item="CAN_2010_30m"):
+                sum(range(100000))
+                raise ValueError()
+        self.assertIs(timing.stop_recording(), recorder)
+
+        record, = recorder.records
+        self.assertEqual(record.name, "work")
+        self.assertEqual(record.attributes, {"item": "CAN_2010_30m"})
+        self.assertGreater(record.wall, 0)
+        self.assertGreaterEqual(record.cpu, 0)
+        self.assertGreater(record.peak_rss, 0)
+        self.assertEqual(recorder.summary()["work"]["count"], 1)
+
+    def test_create_and_save_collection_stages(self):
+        recorder = timing.start_recording()
+        with TemporaryDirectory() as tmp_dir:
+            root_col = create_full_collection(workers=2)
+            root_col.normalize_hrefs(tmp_dir)
+            save_collection(root_col, workers=2)
+        timing.stop_recording()
+
+        summary = recorder.summary()
+        items = [r for r in recorder.records if r.name == "create_item"]
+        self.assertEqual(len(items), len(list(root_col.get_all_items())))
+        self.assertIn("CAN_2010_30m", [r.attributes["item"] for r in items])
+        self.assertEqual(summary["create_period_items"]["count"], 2)
+        self.assertEqual(summary["write_items"]["count"], 1)
+        self.assertEqual(summary["write_collections"]["count"], 1)
+
+    def test_timings_and_profile_options(self):
+        cli = click.Group()
+        create_nalcms_command(cli)
+        with TemporaryDirectory() as tmp_dir:
+            timings = os.path.join(tmp_dir, "timings.json")
+            profile = os.path.join(tmp_dir, "create-items.prof")
+            result = CliRunner().invoke(cli, [
+                "nalcms", "--timings", timings, "--cprofile", profile, "create-items", "-o",
+                os.path.join(tmp_dir, "items.ndjson"), "-p", "change"
+            ])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIsNone(timing.stop_recording())
+
+            with open(timings) as f:
+                report = json.load(f)
+            self.assertGreater(report["summary"]["create_item"]["count"], 0)
+            self.assertGreater(report["peak_rss"], 0)
+            self.assertGreater(pstats.Stats(profile).total_calls, 0)
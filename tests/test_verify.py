@@ -0,0 +1,76 @@
+import json
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from urllib.parse import urlparse
+
+import click
+from click.testing import CliRunner
+
+from stactools.nalcms.commands import create_nalcms_command
+from stactools.nalcms.verify import remote_assets, verify_assets
+from tests.http_server import StandInServer
+
+
+def server_files(href_dir: str) -> dict:
+    # Every remote asset, with distinct sizes
+    return {
+        urlparse(asset.href).path: 1024 + i
+        for i, asset in enumerate(remote_assets(href_dir))
+    }
+
+
+class TestVerify(unittest.TestCase):
+    def test_remote_assets(self):
+        assets = remote_assets("http://example.com/files")
+        data = [asset for asset in assets if asset.role == "data"]
+        self.assertEqual(len(data), 15)
+        self.assertEqual(len(assets) - len(data), 6)
+        self.assertTrue(all(asset.href.startswith("http://example.com/files/") for asset in assets))
+
+        shared = {asset.href.rsplit("/", 1)[1]: asset for asset in data if len(asset.products) > 1}
+        self.assertEqual(sorted(shared["Land_Cover_2005v3_TIFF.zip"].products),
+                         ["HI_2005_250m", "NA_2005_250m"])
+
+    def test_verify_assets(self):
+        for allow_head in [True, False]:
+            with StandInServer({}, allow_head) as server:
+                href_dir = server.url + "files/"
+                server.files = server_files(href_dir)
+                missing = urlparse(remote_assets(href_dir)[0].href).path
+                del server.files[missing]
+
+                checks = verify_assets(href_dir, concurrency=4, rate=None)
+
+            self.assertEqual(len(checks), 21)
+            self.assertEqual([c.asset.href for c in checks],
+                             [a.href for a in remote_assets(href_dir)])
+            self.assertEqual(checks[0].error, "HTTP 404")
+            self.assertTrue(checks[0].missing)
+            self.assertTrue(all(check.ok for check in checks[1:]))
+            self.assertEqual([check.size for check in checks[1:]], list(range(1025, 1045)))
+            self.assertTrue(all(check.seconds >= 0 for check in checks))
+
+            methods = {method for method, _, _ in server.requests}
+            self.assertEqual(methods, {"HEAD"} if allow_head else {"HEAD", "GET"})
+
+    def test_verify_assets_command(self):
+        cli = click.Group()
+        create_nalcms_command(cli)
+        runner = CliRunner()
+
+        with StandInServer({}) as server, TemporaryDirectory() as tmp_dir:
+            href_dir = server.url + "files/"
+            server.files = server_files(href_dir)
+            report = os.path.join(tmp_dir, "report.json")
+
+            args = ["nalcms", "verify-assets", "--href-dir", href_dir, "--rate", "0"]
+            result = runner.invoke(cli, args + ["-o", report])
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(report) as f:
+                self.assertEqual(len(json.load(f)), 21)
+
+            del server.files[next(iter(server.files))]
+            result = runner.invoke(cli, args)
+            self.assertEqual(result.exit_code, 1)
+            self.assertIn("MISSING", result.output)
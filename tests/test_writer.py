@@ -0,0 +1,71 @@
+import json
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import fsspec
+
+from stactools.nalcms import writer
+from stactools.nalcms.manifest import MANIFEST_FILENAME
+from stactools.nalcms.stac import create_full_collection, save_collection
+
+
+class TestWriter(unittest.TestCase):
+    def test_dumps(self):
+        stac_dict = {"id": "NA_2010_30m", "bbox": (-180.0, 14.0, -50.0, 84.0), "title": "Année"}
+        expected = json.loads(json.dumps(stac_dict))
+
+        for fast in [True, False]:
+            with mock.patch.object(writer, "orjson", writer.orjson if fast else None):
+                indented = writer.dumps(stac_dict)
+                compact = writer.dumps(stac_dict, indent=False)
+            self.assertEqual(json.loads(indented), expected)
+            self.assertEqual(json.loads(compact), expected)
+            self.assertIn(b'\n  "id"', indented)
+            self.assertNotIn(b" ", compact.replace(b"Ann\xc3\xa9e", b""))
+
+    def test_save_collection_matches_pystac(self):
+        with TemporaryDirectory() as pystac_dir, TemporaryDirectory() as compact_dir:
+            root_col = create_full_collection()
+            root_col.normalize_hrefs(pystac_dir)
+            root_col.save()
+            root_col.normalize_hrefs(compact_dir)
+            save_collection(root_col, workers=4, indent=False)
+
+            count = 0
+            for d, _, files in os.walk(pystac_dir):
+                for f in files:
+                    path = os.path.join(d, f)
+                    compact_path = os.path.join(compact_dir, os.path.relpath(path, pystac_dir))
+                    with open(path) as saved, open(compact_path) as compact:
+                        text = compact.read()
+                        self.assertEqual(json.loads(saved.read().replace(pystac_dir, compact_dir)),
+                                         json.loads(text))
+                        self.assertNotIn("\n", text)
+                    count += 1
+            self.assertEqual(count, 22)
+
+    def test_save_collection_to_fsspec_url(self):
+        fs = fsspec.filesystem("memory")
+        destination = "memory://nalcms-writer-test"
+        try:
+            root_col = create_full_collection()
+            root_col.normalize_hrefs(destination)
+            save_collection(root_col, workers=4, incremental=True)
+
+            paths = fs.find(destination)
+            self.assertEqual(len(paths), 23)
+            self.assertIn(f"/nalcms-writer-test/{MANIFEST_FILENAME}", paths)
+            saved = writer.read_json(f"{destination}/collection.json")
+            self.assertEqual(saved["id"], root_col.id)
+
+            # Nothing changed, nothing is rewritten
+            fs.rm(f"{destination}/collection.json")
+            item_path = f"{destination}/NALCMS_yearly/CAN_2010_30m/CAN_2010_30m.json"
+            fs.pipe(item_path, b"unchanged")
+            save_collection(root_col, workers=4, incremental=True)
+            self.assertEqual(fs.cat(item_path), b"unchanged")
+            self.assertTrue(writer.exists(f"{destination}/collection.json"))
+        finally:
+            fs.rm(destination, recursive=True)